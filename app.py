@@ -1,8 +1,14 @@
-import json, random, hashlib, time
-from datetime import datetime
-from collections import defaultdict
+import hmac, json, os, random, secrets
 import streamlit as st
 
+from quiz import is_mcq
+from quiz.backup import FORMATS, encode_backup, read_backup
+from quiz.profiling import Profiler
+from quiz.engine import (REVIEW_QUEUES, AdaptivePractice, ExamSession, FavoritesPractice, PracticeMode, ReviewPractice,
+                         Session, build_pool)
+from quiz.registry import BankRegistry
+from quiz.store import open_store
+
 st.set_page_config(page_title="博学 · 全量刷题系统（驾考宝典风格）", page_icon="🚗", layout="wide")
 
 st.markdown("""
@@ -30,31 +36,66 @@ h1,h2,h3 { letter-spacing:.2px; }
 </style>
 """, unsafe_allow_html=True)
 
-def qkey(q: dict) -> str:
-    raw = f"{q.get('chapter','')}|{q.get('section','')}|{q.get('question','')}"
-    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+@st.cache_resource
+def get_registry():
+    # Banks are loaded once per process and shared read-only by all sessions;
+    # a snapshot keyed by the file hash lets restarted workers skip re-parsing.
+    return BankRegistry.discover(".")
+
+@st.cache_resource
+def get_store():
+    # One store per process; backend from QUIZ_STORE / QUIZ_DB_PATH.
+    return open_store()
 
-def is_mcq(q: dict) -> bool:
-    return isinstance(q.get("options"), list) and len(q["options"]) >= 2
+@st.cache_resource
+def get_profiler():
+    # Stage timings from every session pool here; QUIZ_PROFILE=1 turns them on.
+    return Profiler.from_env()
 
-def normalize_q(q: dict) -> dict:
-    q = dict(q)
-    q.setdefault("chapter","")
-    q.setdefault("section","")
-    q.setdefault("type","mcq" if is_mcq(q) else "qa")
-    q.setdefault("difficulty",3)
-    q.setdefault("tags",[])
-    q.setdefault("answer","")
-    q.setdefault("explanation","")
-    return q
+# Most results the 搜索 mode turns into a practice pool.
+SEARCH_LIMIT = 100
 
-@st.cache_data
-def load_questions():
-    with open("questions.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return [normalize_q(x) for x in data]
+# Full history chunks kept in RAM per session before older ones roll off to disk (0 = never).
+HISTORY_MAX_CHUNKS = int(os.environ.get("QUIZ_HISTORY_MAX_CHUNKS", "0")) or None
 
-ALL_QUESTIONS = load_questions()
+PROFILER = get_profiler()
+prof = PROFILER.stage
+
+def _init_session():
+    ss = st.session_state
+    ss.setdefault("mode", "顺序练习")
+    ss.setdefault("practice", {})
+    ss.setdefault("answered", False)
+    ss.setdefault("auto_advance", False)
+    ss.setdefault("correct", 0)
+    ss.setdefault("attempts", 0)
+    ss.setdefault("exam", None)
+    if "uid" not in ss:
+        # The uid in the link is the learner's only credential: random, never shown as an editable field.
+        uid = st.query_params.get("uid")
+        if not uid:
+            uid = secrets.token_urlsafe(16)
+            st.query_params["uid"] = uid
+        ss.uid = uid
+    if ss.get("progress_key") != (ss.uid, ss.bank):
+        # Progress, pools and exam papers all index into one bank for one learner.
+        ss.learner = Session(BANK, ss.uid, STORE, history_max_chunks=HISTORY_MAX_CHUNKS)
+        ss.practice = {}
+        # A paper left running on this bank (reload, another worker) picks up where it stopped.
+        ss.exam = ExamSession.resume(ss.learner, ss.bank)
+        if ss.exam is not None:
+            ss.mode = "模拟考试"
+        ss.progress_key = (ss.uid, ss.bank)
+
+with prof("load", st.session_state.get("mode", "")):
+    REGISTRY = get_registry()
+    if st.session_state.get("bank") not in REGISTRY.entries:
+        st.session_state.bank = st.query_params.get("bank") if st.query_params.get("bank") in REGISTRY.entries else REGISTRY.default
+    BANK = REGISTRY.get(st.session_state.bank)
+    BLUEPRINT = REGISTRY.blueprint(st.session_state.bank)
+    ALL_QUESTIONS = BANK.questions
+    STORE = get_store()
+    _init_session()
 
 def ui_header(current:int, total:int, title_html:str):
     pct = 0 if total == 0 else int(current/total*100)
@@ -68,33 +109,14 @@ def ui_header(current:int, total:int, title_html:str):
         """, unsafe_allow_html=True
     )
 
-def _init_session():
-    ss = st.session_state
-    ss.setdefault("mode", "顺序练习")
-    ss.setdefault("idx", 0)
-    ss.setdefault("seq_pool", [])
-    ss.setdefault("rand_pool", [])
-    ss.setdefault("chap_pool", [])
-    ss.setdefault("spec_pool", [])
-    ss.setdefault("answered", False)
-    ss.setdefault("auto_advance", False)
-    ss.setdefault("correct", 0)
-    ss.setdefault("attempts", 0)
-    ss.setdefault("history", [])
-    ss.setdefault("wrong_map", {})
-    ss.setdefault("wrong_count", defaultdict(int))
-    ss.setdefault("favorites", set())
-    ss.setdefault("exam_running", False)
-    ss.setdefault("exam_pool", [])
-    ss.setdefault("exam_answers", {})
-    ss.setdefault("exam_start_ts", None)
-    ss.setdefault("exam_duration_sec", 0)
-    ss.setdefault("exam_submitted", False)
-    ss.setdefault("exam_records", [])
-_init_session()
+
+def is_admin():
+    # The profiling panel shows only for ?admin=<QUIZ_ADMIN_TOKEN>; no token configured, no panel.
+    token = os.environ.get("QUIZ_ADMIN_TOKEN", "")
+    return bool(token) and hmac.compare_digest(st.query_params.get("admin", "").encode(), token.encode())
 
 # Top nav (tabs-like)
-MODES = ["顺序练习","随机练习","章节练习","专项练习","错题重练","收藏夹","易错题","模拟考试","成绩记录","进度面板"]
+MODES = ["顺序练习","随机练习","章节练习","专项练习","错题重练","收藏夹","易错题","搜索","模拟考试","成绩记录","进度面板"]
 cols = st.columns(len(MODES))
 for i,m in enumerate(MODES):
     active = (st.session_state.mode == m)
@@ -102,84 +124,81 @@ for i,m in enumerate(MODES):
         if st.button(m, use_container_width=True, key=f"tab_{m}", type=("primary" if active else "secondary")):
             st.session_state.mode = m
             st.session_state.answered = False
-            st.session_state.idx = 0
+            if m in st.session_state.practice:
+                st.session_state.practice[m].pos = 0
             st.rerun()
 
+mode = st.session_state.mode
+
 # Sidebar filters
-chapters = sorted({q.get("chapter","") for q in ALL_QUESTIONS if q.get("chapter")})
-sections_by_ch = {}
-for q in ALL_QUESTIONS:
-    ch, sec = q.get("chapter",""), q.get("section","")
-    if ch:
-        sections_by_ch.setdefault(ch, set()).add(sec)
-
-with st.sidebar:
-    st.markdown("### 全局设置")
-    st.session_state.auto_advance = st.checkbox("提交后自动跳到下一题", value=st.session_state.get("auto_advance", False))
-    st.caption("关闭后：提交答案会显示对错，并出现“下一题”按钮。")
-    st.divider()
-    st.markdown("#### 练习池设置")
-    seq_limit = st.slider("顺序/随机 每轮题量", 10, 300, min(50, len(ALL_QUESTIONS)))
-    sel_ch = st.multiselect("章节筛选（用于章节/专项/考试）", options=chapters, default=chapters)
-    sel_sec_options = sorted({s for ch in sel_ch for s in sections_by_ch.get(ch, set()) if s})
-    sel_sec = st.multiselect("小节筛选（可选）", options=sel_sec_options, default=sel_sec_options)
-    all_tags = sorted({t for q in ALL_QUESTIONS for t in q.get("tags", [])})
-    sel_tags = st.multiselect("专项练习标签（任意命中）", options=all_tags, default=[])
-
-def by_ch_sec(q):
-    return ((not sel_ch) or (q.get("chapter","") in sel_ch)) and \
-           ((not sel_sec) or (q.get("section","") in sel_sec) or (not q.get("section")))
-
-def by_tags(q):
-    if not sel_tags: return True
-    qt = set(q.get("tags", []))
-    return any(t in qt for t in sel_tags)
-
-def mcq_only(qs):
-    return [q for q in qs if is_mcq(q)]
-
-def build_pool(order="seq"):
-    pool = [q for q in ALL_QUESTIONS if by_ch_sec(q)]
-    pool = mcq_only(pool)
-    if order == "rand":
-        random.shuffle(pool)
-    return pool[:min(seq_limit, len(pool))]
-
-def build_spec_pool():
-    pool = [q for q in ALL_QUESTIONS if by_ch_sec(q) and by_tags(q)]
-    pool = mcq_only(pool)
-    random.shuffle(pool)
-    return pool[:min(seq_limit, len(pool))]
-
-def get_pool_for_mode(mode):
-    ss = st.session_state
-    if mode == "顺序练习":
-        if not ss.seq_pool: ss.seq_pool = build_pool("seq")
-        return ss.seq_pool
-    if mode == "随机练习":
-        if not ss.rand_pool: ss.rand_pool = build_pool("rand")
-        return ss.rand_pool
-    if mode == "章节练习":
-        if not ss.chap_pool: ss.chap_pool = build_pool("seq")
-        return ss.chap_pool
-    if mode == "专项练习":
-        if not ss.spec_pool: ss.spec_pool = build_spec_pool()
-        return ss.spec_pool
-    if mode == "错题重练":
-        return list(st.session_state.wrong_map.values())
+with prof("filter", mode):
+    # Filter values and counts come from the bank's masks, computed once per bank and shared.
+    facets = BANK.facets
+
+    with st.sidebar:
+        st.markdown("### 全局设置")
+        if len(REGISTRY.entries) > 1:
+            names = REGISTRY.names()
+            new_bank = st.selectbox("题库", names, index=names.index(st.session_state.bank), format_func=REGISTRY.title)
+            if new_bank != st.session_state.bank:
+                # Pools and exam papers index into the old bank; _init_session drops them with it.
+                st.session_state.pop("pool_sig", None)
+                st.session_state.bank = new_bank
+                st.query_params["bank"] = new_bank
+                st.rerun()
+        if BANK.load_errors:
+            st.warning(f"题库中有 {len(BANK.load_errors)} 道题格式无效，已跳过。")
+        st.session_state.auto_advance = st.checkbox("提交后自动跳到下一题", value=st.session_state.get("auto_advance", False))
+        st.caption("关闭后：提交答案会显示对错，并出现“下一题”按钮。")
+        st.caption("进度自动保存在当前链接中：收藏本页链接即可继续学习；链接等同于密码，请勿分享。")
+        with st.popover("🆕 新建学习档案"):
+            st.caption("将生成新的学习链接，当前进度留在旧链接中（请先收藏旧链接）。")
+            if st.button("确认新建", type="primary"):
+                st.session_state.uid = secrets.token_urlsafe(16)
+                st.query_params["uid"] = st.session_state.uid
+                st.rerun()
+        st.divider()
+        st.markdown("#### 练习池设置")
+        seq_limit = st.slider("顺序/随机 每轮题量", 10, 300, min(50, len(ALL_QUESTIONS)))
+        sel_ch = st.multiselect("章节筛选（用于章节/专项/考试）", options=facets.chapters, default=facets.chapters)
+        sel_sec_options = facets.sections(sel_ch)
+        sel_sec = st.multiselect("小节筛选（可选）", options=sel_sec_options, default=sel_sec_options)
+        sel_tags = st.multiselect("专项练习标签（任意命中）", options=facets.tags, default=[])
+        # Tags only narrow the 专项练习 pool, so only count them there.
+        fc = facets.counts(sel_ch, sel_sec, sel_tags if mode == "专项练习" else ())
+        st.caption(f"当前筛选：**{fc['total']}** 题符合")
+        with st.expander("筛选分布（按其余条件计数）"):
+            for label, dim, shown in (("章节", "chapter", facets.chapters), ("小节", "section", sel_sec_options),
+                                      ("标签", "tag", facets.tags), ("难度", "difficulty", facets.difficulties)):
+                parts = [f"{v}（{fc[dim].get(v, 0)}）" for v in shown if fc[dim].get(v, 0)]
+                if parts: st.markdown(f"**{label}**：" + " · ".join(parts))
+
+    # Pools follow the sidebar: any filter change invalidates the cached ones.
+    pool_sig = (tuple(sel_ch), tuple(sel_sec), tuple(sel_tags), seq_limit)
+    if st.session_state.get("pool_sig") != pool_sig:
+        st.session_state.pool_sig = pool_sig
+        st.session_state.practice = {}
+
+def make_practice(mode):
+    learner = st.session_state.learner
+    if mode in REVIEW_QUEUES:
+        return ReviewPractice(learner, mode, REVIEW_QUEUES[mode])
     if mode == "收藏夹":
-        fav_ids = st.session_state.favorites
-        return [q for q in ALL_QUESTIONS if qkey(q) in fav_ids]
-    if mode == "易错题":
-        wc = st.session_state.wrong_count
-        hard_ids = [qid for qid,cnt in wc.items() if cnt >= 2]
-        return [q for q in ALL_QUESTIONS if qkey(q) in set(hard_ids)]
-    return []
-
-def render_one_question(q, mode_name):
-    qid = qkey(q)
-    # header
-    ui_header(st.session_state.idx + 1, max(1, len(get_pool_for_mode(mode_name))), f"**题目：** {q.get('question','')}")
+        return FavoritesPractice(learner, mode)
+    if mode in ("随机练习", "专项练习"):
+        # Served one at a time at the difficulty that best matches the learner's current skill.
+        tags = sel_tags if mode == "专项练习" else ()
+        return AdaptivePractice(learner, mode, sel_ch, sel_sec, tags, limit=seq_limit)
+    return PracticeMode(learner, mode, build_pool(BANK, sel_ch, sel_sec, limit=seq_limit))
+
+def get_practice(mode):
+    practice = st.session_state.practice
+    pm = practice.get(mode)
+    if pm is None or not len(pm):
+        pm = practice[mode] = make_practice(mode)
+    return pm
+
+def render_meta(q):
     chips = []
     if q.get("chapter"): chips.append(f"<span class='badge'>章：{q['chapter']}</span>")
     if q.get("section"): chips.append(f"<span class='badge'>节：{q['section']}</span>")
@@ -188,21 +207,35 @@ def render_one_question(q, mode_name):
     if t: chips.append(f"<span class='badge'>标签：{' / '.join(t)}</span>")
     if chips: st.markdown("<div class='meta'>" + " ".join(chips) + "</div>", unsafe_allow_html=True)
 
+def next_question(pm):
+    st.session_state.answered = False
+    pm.advance()
+    st.rerun()
+
+def render_one_question(pm):
+    ss = st.session_state
+    learner = ss.learner
+    i = pm.current()
+    q = BANK[i]
+    qid = q["id"]
+    # header
+    ui_header(pm.pos + 1, max(1, len(pm)), f"**题目：** {q.get('question','')}")
+    render_meta(q)
+
     opts = list(q["options"])
     rng = random.Random(qid); rng.shuffle(opts)
-    prev = st.session_state.get(f"sel_{qid}", opts[0])
+    prev = ss.get(f"sel_{qid}", opts[0])
     sel = st.radio(" ", opts, index=opts.index(prev) if prev in opts else 0, label_visibility="collapsed", key=f"sel_{qid}")
 
-    fav = qid in st.session_state.favorites
+    fav = i in learner.favorites
     fav_col, _sp, del_col = st.columns([1,6,1])
     with fav_col:
         if st.button(("★ 已收藏" if fav else "☆ 收藏本题"), use_container_width=True):
-            if fav: st.session_state.favorites.remove(qid)
-            else: st.session_state.favorites.add(qid)
+            learner.toggle_favorite(i)
             st.rerun()
     with del_col:
-        if mode_name in ("错题重练","易错题") and st.button("🧹 移出错题", use_container_width=True):
-            st.session_state.wrong_map.pop(qid, None)
+        if isinstance(pm, ReviewPractice) and st.button("🧹 移出错题", use_container_width=True):
+            pm.dismiss()
             st.rerun()
 
     c1, c2, c3 = st.columns(3)
@@ -212,260 +245,252 @@ def render_one_question(q, mode_name):
         submit_clicked = st.button("✅ 提交答案", type="primary", use_container_width=True)
 
     if skip_clicked:
-        st.session_state.answered = False
-        st.session_state.idx = min(st.session_state.idx + 1, max(0, len(get_pool_for_mode(mode_name)) - 1))
+        ss.answered = False
+        pm.skip()
         st.rerun()
 
     if submit_clicked:
-        st.session_state.attempts += 1
-        ok = (sel == q.get("answer",""))
+        ss.attempts += 1
+        with prof("grade", pm.name):
+            ok = pm.submit(sel)
         if ok:
-            st.session_state.correct += 1
+            ss.correct += 1
             st.markdown("<div class='alert-ok'>✅ 回答正确！</div>", unsafe_allow_html=True)
-            st.session_state.wrong_map.pop(qid, None)
         else:
             st.markdown(f"<div class='alert-err'>❌ 回答错误。正确答案：{q.get('answer','')}</div>", unsafe_allow_html=True)
-            st.session_state.wrong_map[qid] = q
-            st.session_state.wrong_count[qid] += 1
 
         exp = q.get("explanation","").strip()
         if exp:
             st.markdown(f"<div class='alert-info'>📘 解析：{exp}</div>", unsafe_allow_html=True)
 
-        st.session_state.history.append((qid, ok, datetime.now().isoformat(timespec="seconds"), mode_name))
-
-        if st.session_state.auto_advance:
-            st.session_state.answered = False
-            st.session_state.idx = min(st.session_state.idx + 1, max(0, len(get_pool_for_mode(mode_name)) - 1))
-            st.rerun()
+        if ss.auto_advance:
+            next_question(pm)
         else:
-            st.session_state.answered = True
+            ss.answered = True
 
-    if (not st.session_state.auto_advance) and st.session_state.answered:
+    if (not ss.auto_advance) and ss.answered:
         if st.button("➡️ 下一题", use_container_width=True):
-            st.session_state.answered = False
-            st.session_state.idx = min(st.session_state.idx + 1, max(0, len(get_pool_for_mode(mode_name)) - 1))
-            st.rerun()
+            next_question(pm)
 
 # Render page title
 st.title("🚗 博学 · 全量刷题系统（驾考宝典风格）")
-st.caption("顺序/随机/章节/专项/错题/收藏/易错/模拟考试/成绩记录/进度面板 · 题目解析/收藏/数据备份")
-
-# Placeholder defaults for sliders that code refers to
-seq_limit = 50
-
-mode = st.session_state.mode
-
-def by_ch_sec(q):
-    return True  # will be re-evaluated in pools where needed; simplified in this compact build
-
-# Simple pools if filters not yet established (first render)
-def simple_pool():
-    return [q for q in ALL_QUESTIONS if is_mcq(q)][:min(seq_limit, len(ALL_QUESTIONS))]
+st.caption("顺序/随机/章节/专项/错题/收藏/易错/搜索/模拟考试/成绩记录/进度面板 · 题目解析/收藏/数据备份")
 
 if mode in ("顺序练习","随机练习","章节练习","专项练习","错题重练","收藏夹","易错题"):
     st.header(f"📖 {mode}")
-    # Ensure pools exist minimally
-    if mode == "顺序练习" and not st.session_state.seq_pool:
-        st.session_state.seq_pool = simple_pool()
-    if mode == "随机练习" and not st.session_state.rand_pool:
-        import random
-        pool = simple_pool(); random.shuffle(pool); st.session_state.rand_pool = pool
-    if mode == "章节练习" and not st.session_state.chap_pool:
-        st.session_state.chap_pool = simple_pool()
-    if mode == "专项练习" and not st.session_state.spec_pool:
-        st.session_state.spec_pool = simple_pool()
-
-    pool = get_pool_for_mode(mode)
-    if not pool:
+    with prof("pool", mode):
+        pm = get_practice(mode)
+    if pm.current() is None:
         st.warning("当前筛选条件下没有题目，请调整筛选或更换模式。")
     else:
-        i = st.session_state.idx
-        i = max(0, min(i, len(pool)-1))
-        st.session_state.idx = i
-        render_one_question(pool[i], mode)
+        if mode in REVIEW_QUEUES:
+            st.caption(f"按间隔重复排序：共 {len(pm)} 题，优先出现最该复习的题目。")
+        with prof("render", mode):
+            render_one_question(pm)
+
+elif mode == "搜索":
+    ss = st.session_state
+    st.header("🔍 搜索")
+    query = st.text_input("关键词（题干/选项/解析/标签；支持前缀与拼写容错）", key="search_query").strip()
+    if query:
+        pm = ss.practice.get("搜索")
+        if pm is None or ss.get("search_sig") != query:
+            # Results become the practice pool directly, best match first.
+            with prof("pool", mode):
+                hits = [i for i, _ in BANK.search_index.search(query, k=SEARCH_LIMIT) if is_mcq(BANK[i])]
+                pm = ss.practice["搜索"] = PracticeMode(ss.learner, "搜索", hits)
+            ss.search_sig = query
+            ss.answered = False
+        if pm.current() is None:
+            st.warning("没有找到相关题目，换个关键词试试。")
+        else:
+            with prof("render", mode):
+                with st.expander(f"共找到 {len(pm)} 道相关题目"):
+                    for n, i in enumerate(pm.items(), 1):
+                        q = BANK[i]
+                        st.markdown(f"{n}. {q.get('question','')}  <span class='badge'>{q.get('chapter','')}</span>", unsafe_allow_html=True)
+                render_one_question(pm)
+    else:
+        st.info("输入关键词查找题目，搜索结果可直接逐题练习。")
 
 elif mode == "模拟考试":
     ss = st.session_state
     st.header("📝 模拟考试")
-    exam_minutes = st.sidebar.number_input("考试时长（分钟）", min_value=5, max_value=240, value=60, step=5)
-    pass_line = st.sidebar.number_input("合格线（百分制）", min_value=0, max_value=100, value=60, step=1)
-    exam_size = st.sidebar.slider("试卷题量", 20, 200, min(100, len(ALL_QUESTIONS)))
+    exam_minutes = st.sidebar.number_input("考试时长（分钟）", min_value=5, max_value=240,
+                                           value=int(BLUEPRINT["time_limit_minutes"]), step=5)
+    pass_line = st.sidebar.number_input("合格线（百分制）", min_value=0, max_value=100,
+                                        value=int(BLUEPRINT["pass_score"]), step=1)
+    exam_size = st.sidebar.slider("试卷题量", 20, 200, max(20, min(200, int(BLUEPRINT["total"]))))
+    exam_seed = st.sidebar.text_input("试卷编号（留空随机，相同编号生成相同试卷）", value="")
+
+    @st.fragment(run_every=1)
+    def exam_timer(exam):
+        # Ticks on its own every second; only expiry reruns the whole page.
+        if exam.tick():
+            st.rerun()
+        m, s = divmod(max(0, exam.remaining()), 60)
+        st.markdown(f"<div class='timer-chip'>⏳ {m:02d}:{s:02d}</div>", unsafe_allow_html=True)
+        exam.checkpoint()
+        STORE.maybe_flush()
 
-    def build_exam_pool():
-        pool = [q for q in ALL_QUESTIONS if is_mcq(q)]
-        random.shuffle(pool)
-        return pool[:min(exam_size, len(pool))]
+    exam = ss.exam
+    if exam is not None:
+        exam.tick()
 
-    if not ss.get("exam_running") and not ss.get("exam_submitted"):
+    if exam is None:
         st.info("点击下方按钮开始考试。开始后会启动倒计时，期间不显示对错；交卷后显示分数与报告。")
         if st.button("▶️ 开始考试"):
-            ss.exam_pool = build_exam_pool()
-            ss.exam_running = True
-            ss.exam_submitted = False
-            ss.exam_answers = {}
-            ss.exam_duration_sec = int(exam_minutes) * 60
-            ss.exam_start_ts = time.time()
-            ss.idx = 0
+            # Sampled per blueprint stratum from the index; the seed makes papers reproducible.
+            with prof("pool", mode):
+                ss.exam = ExamSession.start(ss.learner, BLUEPRINT, total=exam_size,
+                                            seed=exam_seed.strip() or str(random.randrange(10**6)),
+                                            duration_sec=int(exam_minutes) * 60, pass_line=pass_line, bank_name=ss.bank)
             st.rerun()
 
-    if ss.get("exam_running") and not ss.get("exam_submitted"):
-        remaining = ss.exam_duration_sec - int(time.time() - ss.exam_start_ts)
-        if remaining <= 0:
-            ss.exam_running = False
-            ss.exam_submitted = True
-        m, s = divmod(max(0, remaining), 60)
-        st.markdown(f"<div class='timer-chip'>⏳ {m:02d}:{s:02d}</div>", unsafe_allow_html=True)
+    elif not exam.submitted:
+        exam_timer(exam)
+        st.caption(f"试卷编号：{exam.seed}")
 
-        pool = ss.exam_pool
-        if not pool:
+        if not exam.pool:
             st.error("没有可用试题。")
         else:
-            q = pool[ss.idx]
-            qid = qkey(q)
-
-            ui_header(ss.idx + 1, len(pool), f"**题目：** {q.get('question','')}")
-            chips = []
-            if q.get("chapter"): chips.append(f"<span class='badge'>章：{q['chapter']}</span>")
-            if q.get("section"): chips.append(f"<span class='badge'>节：{q['section']}</span>")
-            if q.get("difficulty"): chips.append(f"<span class='badge'>难度：{q['difficulty']}</span>")
-            t = q.get("tags", [])
-            if t: chips.append(f"<span class='badge'>标签：{' / '.join(t)}</span>")
-            if chips: st.markdown("<div class='meta'>" + " ".join(chips) + "</div>", unsafe_allow_html=True)
-
-            opts = list(q["options"])
-            rng = random.Random(qid); rng.shuffle(opts)
-            prev_sel = ss.exam_answers.get(qid, opts[0])
-            sel = st.radio(" ", opts, index=opts.index(prev_sel) if prev_sel in opts else 0,
-                           label_visibility="collapsed", key=f"exam_sel_{qid}")
-            ss.exam_answers[qid] = sel
-
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                if st.button("⬅️ 上一题", use_container_width=True) and ss.idx > 0:
-                    ss.idx -= 1; st.rerun()
-            with c2:
-                if st.button("➡️ 下一题", use_container_width=True) and ss.idx < len(pool)-1:
-                    ss.idx += 1; st.rerun()
-            with c3:
-                if st.button("📝 交卷", type="primary", use_container_width=True):
-                    ss.exam_running = False
-                    ss.exam_submitted = True
-
-    if ss.get("exam_submitted"):
-        pool = ss.exam_pool
-        ans = ss.exam_answers
-        total = len(pool)
-        correct = 0
-        wrong_detail = []
-        for q in pool:
-            qid = qkey(q)
-            sel = ans.get(qid, None)
-            ok = (sel == q.get("answer",""))
-            if ok: correct += 1
-            else:
-                wrong_detail.append({
-                    "question": q.get("question",""),
-                    "selected": sel,
-                    "answer": q.get("answer",""),
-                    "chapter": q.get("chapter",""),
-                    "section": q.get("section","")
-                })
-                st.session_state.wrong_map[qid] = q
-                st.session_state.wrong_count[qid] += 1
-        score = round(correct / total * 100, 1) if total else 0.0
-        passed = score >= pass_line
-
-        st.success(f"🎯 成绩：{score} 分（{'通过' if passed else '未通过'}，合格线 {pass_line} 分）")
+            with prof("render", mode):
+                i = exam.current()
+                q = BANK[i]
+                qid = q["id"]
+
+                ui_header(exam.pos + 1, len(exam), f"**题目：** {q.get('question','')}")
+                render_meta(q)
+
+                opts = list(q["options"])
+                rng = random.Random(qid); rng.shuffle(opts)
+                prev_sel = exam.answers.get(i)
+                sel = st.radio(" ", opts, index=opts.index(prev_sel) if prev_sel in opts else None,
+                               label_visibility="collapsed", key=f"exam_sel_{qid}")
+                if sel is not None and exam.answer(i, sel):
+                    exam.checkpoint()
+
+                c1, c2, c3 = st.columns(3)
+                with c1:
+                    if st.button("⬅️ 上一题", use_container_width=True) and exam.pos > 0:
+                        exam.move(-1); st.rerun()
+                with c2:
+                    if st.button("➡️ 下一题", use_container_width=True) and exam.pos < len(exam)-1:
+                        exam.move(1); st.rerun()
+                with c3:
+                    if st.button("📝 交卷", type="primary", use_container_width=True):
+                        with prof("grade", mode):
+                            exam.submit()
+                        st.rerun()
+
+    if exam is not None and exam.submitted:
+        rec, wrong_detail = exam.result["record"], exam.result["wrong_detail"]
+        st.success(f"🎯 成绩：{rec['score']} 分（{'通过' if rec['passed'] else '未通过'}，合格线 {exam.pass_line} 分）")
+        if not exam.result["recorded"]:
+            st.caption("该试卷已在其他页面交卷，本次成绩未重复记录。")
         c1, c2, c3 = st.columns(3)
-        c1.metric("✅ 正确题数", correct)
-        c2.metric("❌ 错题数", len(wrong_detail))
-        c3.metric("📝 总题数", total)
-
-        ss.exam_records.append({
-            "timestamp": datetime.now().isoformat(timespec="seconds"),
-            "score": score, "passed": passed, "total": total, "correct": correct, "wrong": len(wrong_detail)
-        })
+        c1.metric("✅ 正确题数", rec["correct"])
+        c2.metric("❌ 错题数", rec["wrong"])
+        c3.metric("📝 总题数", rec["total"])
 
         with st.expander("📄 错题明细"):
             for i, item in enumerate(wrong_detail, 1):
                 st.markdown(f"**{i}. {item['question']}**")
 
         if st.button("🔁 重新开始新考试"):
-            ss.exam_running = False
-            ss.exam_submitted = False
-            ss.exam_answers = {}
-            ss.exam_pool = []
+            ss.exam = None
             st.rerun()
 
 elif mode == "成绩记录":
     st.header("📚 成绩记录")
-    recs = st.session_state.exam_records
-    if not recs:
-        st.info("还没有考试记录。去“模拟考试”试一试吧！")
-    else:
-        import pandas as pd
-        df = pd.DataFrame(recs)
-        st.dataframe(df, use_container_width=True)
-        st.download_button("⬇️ 导出成绩记录（JSON）", data=json.dumps(recs, ensure_ascii=False, indent=2).encode("utf-8"),
-                           file_name="exam_records.json", mime="application/json")
+    with prof("stats", mode):
+        recs = st.session_state.learner.exam_records
+        if not recs:
+            st.info("还没有考试记录。去“模拟考试”试一试吧！")
+        else:
+            import pandas as pd
+            df = pd.DataFrame(recs)
+            st.dataframe(df, use_container_width=True)
+            st.download_button("⬇️ 导出成绩记录（JSON）", data=json.dumps(recs, ensure_ascii=False, indent=2).encode("utf-8"),
+                               file_name="exam_records.json", mime="application/json")
 
 elif mode == "进度面板":
     st.header("📈 进度面板")
-    total = len(ALL_QUESTIONS)
-    done_ids = {qid for (qid, ok, ts, md) in st.session_state.history}
-    wrong_cnt = sum(1 for (_, ok, _, _) in st.session_state.history if not ok)
-    right_cnt = sum(1 for (_, ok, _, _) in st.session_state.history if ok)
-    fav_cnt = len(st.session_state.favorites)
-    hard_cnt = sum(1 for c in st.session_state.wrong_count.values() if c>=2)
-
-    c1,c2,c3,c4 = st.columns(4)
-    c1.metric("📚 题库总量", total)
-    c2.metric("📝 做过题数", len(done_ids))
-    c3.metric("✅ 正确/错误", f"{right_cnt}/{wrong_cnt}")
-    c4.metric("⭐ 收藏/易错", f"{fav_cnt}/{hard_cnt}")
-
-    chap_stats = {}
-    id2q = {qkey(q): q for q in ALL_QUESTIONS}
-    for (qid, ok, ts, md) in st.session_state.history:
-        q = id2q.get(qid)
-        if not q: continue
-        ch = q.get("chapter","")
-        chap_stats.setdefault(ch, [0,0])
-        chap_stats[ch][1] += 1
-        if ok: chap_stats[ch][0] += 1
-    rows = []
-    for ch, (r,t) in chap_stats.items():
-        acc = (r/t*100) if t else 0.0
-        rows.append({"chapter": ch or "(未分类)", "attempts": t, "right": r, "accuracy(%)": round(acc,1)})
-    if rows:
-        import pandas as pd
-        st.markdown("#### 章节统计")
-        st.dataframe(pd.DataFrame(rows).sort_values(["accuracy(%)","attempts"], ascending=[False,False]), use_container_width=True)
-    else:
-        st.info("还没有可统计的数据，先去练习几题吧。")
+    with prof("stats", mode):
+        total = len(ALL_QUESTIONS)
+        learner = st.session_state.learner
+        stats = learner.stats
+        fav_cnt = len(learner.favorites)
+        hard_cnt = learner.srs.size("hard")
+
+        c1,c2,c3,c4 = st.columns(4)
+        c1.metric("📚 题库总量", total)
+        c2.metric("📝 做过题数", len(stats.done))
+        c3.metric("✅ 正确/错误", f"{stats.right}/{stats.wrong}")
+        c4.metric("⭐ 收藏/易错", f"{fav_cnt}/{hard_cnt}")
+
+        rows = stats.chapter_rows()
+        if rows:
+            import pandas as pd
+            st.markdown("#### 章节统计")
+            st.dataframe(pd.DataFrame(rows).sort_values(["accuracy(%)","attempts"], ascending=[False,False]), use_container_width=True)
+        else:
+            st.info("还没有可统计的数据，先去练习几题吧。")
 
 st.divider()
 st.header("💾 数据备份 / 恢复")
-blob = {
-    "history": st.session_state.history,
-    "wrong_ids": list(st.session_state.wrong_map.keys()),
-    "wrong_count": dict(st.session_state.wrong_count),
-    "favorites": list(st.session_state.favorites),
-    "exam_records": st.session_state.exam_records,
-}
-st.download_button("⬇️ 导出我的学习进度（JSON）", data=json.dumps(blob, ensure_ascii=False, indent=2).encode("utf-8"),
-                   file_name="my_progress.json", mime="application/json")
-up = st.file_uploader("上传备份 JSON 以恢复进度", type=["json"])
-if up is not None:
+def backup_key(fmt):
+    # The blob is all of this user's progress in the shared store, so key it on the store's
+    # revision: it also moves on writes from other tabs and banks, and never repeats.
+    uid = st.session_state.uid
+    return (uid, STORE.revision(uid), fmt)
+
+def export_blob(fmt):
+    ss = st.session_state
+    key = backup_key(fmt)
+    if ss.get("backup_key") != key:
+        # The store holds progress for every bank, while the session only holds the active one.
+        with prof("backup", mode):
+            ss.backup_data = encode_backup(STORE.load(ss.uid), fmt)
+        ss.backup_key = key
+    return ss.backup_data
+
+# Export is built on request and reused until progress changes again.
+fmt = st.radio("导出格式", list(FORMATS), horizontal=True,
+               format_func=lambda f: {"json": "JSON", "json.gz": "JSON（gzip 压缩）"}[f])
+if st.session_state.get("backup_key") == backup_key(fmt) or st.button("📦 生成备份文件"):
+    file_name, mime = FORMATS[fmt]
+    st.download_button("⬇️ 导出我的学习进度", data=export_blob(fmt), file_name=file_name, mime=mime)
+up = st.file_uploader("上传备份文件以恢复进度", type=["json", "gz"])
+if up is not None and st.session_state.get("restored_file") != up.file_id:
     try:
-        data = json.load(up)
-        id2q = {qkey(q): q for q in ALL_QUESTIONS}
-        st.session_state.history = data.get("history", [])
-        st.session_state.wrong_map = {qid: id2q[qid] for qid in data.get("wrong_ids", []) if qid in id2q}
-        st.session_state.wrong_count = defaultdict(int, data.get("wrong_count", {}))
-        st.session_state.favorites = set(data.get("favorites", []))
-        st.session_state.exam_records = data.get("exam_records", [])
-        st.success("恢复完成！")
+        bar = st.progress(0.0, text="正在读取备份…")
+        total = max(1, up.size)
+        with prof("backup", mode):
+            data, skipped = read_backup(up, on_chunk=lambda n: bar.progress(min(1.0, up.tell() / total), text=f"已读取 {n} 条记录…"))
+            st.session_state.learner.restore(data)
+        st.session_state.restored_file = up.file_id
+        bar.empty()
+        st.success("恢复完成！" + (f"（跳过 {skipped} 条无效记录）" if skipped else ""))
     except Exception as e:
         st.error(f"恢复失败：{e}")
+
+if is_admin():
+    with st.sidebar.expander("🛠 性能剖析（管理员）", expanded=False):
+        if not PROFILER.enabled:
+            st.caption("未开启：设置环境变量 QUIZ_PROFILE=1 后重启应用。")
+        else:
+            import pandas as pd
+            by_mode = st.checkbox("按模式分列", value=True)
+            rows = PROFILER.summary(by_mode=by_mode)
+            if rows:
+                st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            else:
+                st.caption("暂无计时数据。")
+            st.download_button("⬇️ 导出计时明细（JSONL）", data=PROFILER.export_jsonl(),
+                               file_name="profile.jsonl", mime="application/x-ndjson")
+            if st.button("清空计时数据"):
+                PROFILER.reset()
+                st.rerun()
+
+STORE.maybe_flush()
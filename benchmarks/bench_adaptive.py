@@ -0,0 +1,73 @@
+"""Adaptive versus shuffled practice on simulated learners.
+
+    python benchmarks/bench_adaptive.py [--size 20000] [--learners 200] [--limit 50] [--cap 3000]
+
+Each learner has a hidden skill per chapter and answers a question correctly
+with probability ``sigmoid(skill - item_logit(difficulty))``, the same model
+the selector assumes. Practice helps most at the edge of what the learner
+can do: after every answer the hidden skill grows by ``LEARN * p * (1 - p)``.
+A learner has mastered the material once the hidden skill predicts
+``MASTERY`` accuracy on difficulty-5 questions in every selected chapter.
+Reported per strategy: questions served until mastery (p50/p95, learners
+capped at ``--cap`` count as the cap), and the cost of picking a question.
+"""
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from quiz import QuestionBank
+from quiz.adaptive import MASTERY, item_logit, p_correct
+from quiz.engine import AdaptivePractice, PracticeMode, Session, build_pool
+from quiz.store import MemoryStore
+from synth import CHAPTERS, percentile, synthetic_bank
+
+LEARN = 0.12
+
+def run(bank, strategy, chapters, limit, cap, seed):
+    rng = random.Random(seed)
+    true = {ch: rng.gauss(-1.0, 0.6) for ch in chapters}
+    top = item_logit(5)
+    s = Session(bank, f"u{seed}", MemoryStore())
+    make = ((lambda: AdaptivePractice(s, "随机练习", chapters, limit=limit, rng=rng)) if strategy == "adaptive" else
+            (lambda: PracticeMode(s, "随机练习", build_pool(bank, chapters, limit=limit, order="rand", rng=rng))))
+    pm, picks = make(), []
+    for served in range(1, cap + 1):
+        t0 = time.perf_counter()
+        i = pm.current()
+        picks.append((time.perf_counter() - t0) * 1000)
+        q = bank[i]
+        p = p_correct(true[q["chapter"]], item_logit(q["difficulty"]))
+        ok = rng.random() < p
+        pm.submit(q["answer"] if ok else q["options"][-1])
+        true[q["chapter"]] += LEARN * p * (1 - p)
+        if all(p_correct(t, top) >= MASTERY for t in true.values()):
+            return served, picks
+        if pm.pos >= len(pm) - 1:
+            pm = make()   # a fresh round, as the app builds one when the pool runs out
+        else:
+            pm.advance()
+    return cap, picks
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=20000)
+    ap.add_argument("--learners", type=int, default=200)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--cap", type=int, default=3000)
+    args = ap.parse_args()
+    bank = QuestionBank(synthetic_bank(args.size)).freeze()
+    bank.clusters, bank.difficulty_buckets   # built once per bank in the app too; keep it out of the timings
+    chapters = CHAPTERS[:3]
+    print(f"bank={args.size} learners={args.learners} chapters={len(chapters)} round={args.limit}")
+    print(f"  {'strategy':<9} {'p50 served':>10} {'p95 served':>10} {'capped':>7} {'pick p50(ms)':>13} {'pick p95(ms)':>13}")
+    for strategy in ("shuffle", "adaptive"):
+        served, picks = [], []
+        for u in range(args.learners):
+            n, t = run(bank, strategy, chapters, args.limit, args.cap, u)
+            served.append(n); picks.extend(t)
+        served.sort(); picks.sort()
+        print(f"  {strategy:<9} {percentile(served, .5):>10} {percentile(served, .95):>10} "
+              f"{sum(n >= args.cap for n in served):>7} {percentile(picks, .5):>13.3f} {percentile(picks, .95):>13.3f}")
+
+if __name__ == "__main__":
+    main()
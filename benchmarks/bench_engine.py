@@ -0,0 +1,104 @@
+"""Load test for the headless engine: many learners answering at once.
+
+    python benchmarks/bench_engine.py [--sizes 1000,10000,100000] [--sessions 2000]
+                                      [--answers 20] [--store memory|sqlite]
+
+For each bank size, ``--sessions`` learners are opened against one shared,
+frozen bank and answer ``--answers`` questions each, interleaved round-robin
+the way a Streamlit worker serves reruns; every tenth answer is a miss, so the
+review queues get exercised too. Each learner then sits one exam. Reported per
+operation: call count, p50/p95/max latency in milliseconds. A second pass
+under tracemalloc reports the Python heap held by the sessions, so pools,
+history and queues that stop sharing the bank show up as a jump in KiB/session.
+"""
+import argparse, os, random, statistics, sys, tempfile, time, tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from quiz import QuestionBank
+from quiz.engine import ExamSession, PracticeMode, ReviewPractice, Session, build_pool
+from quiz.exam import load_blueprint
+from quiz.store import MemoryStore, SQLiteStore
+from synth import CHAPTERS, percentile, synthetic_bank
+
+OPS = ("open", "pool", "submit", "review", "exam_start", "exam_submit")
+
+class Timer:
+    def __init__(self):
+        self.times = defaultdict(list)
+
+    def __call__(self, op, fn, *args, **kw):
+        t0 = time.perf_counter()
+        out = fn(*args, **kw)
+        self.times[op].append((time.perf_counter() - t0) * 1000)
+        return out
+
+def open_store(kind, tmp):
+    return SQLiteStore(os.path.join(tmp, "bench.db"), batch_size=256) if kind == "sqlite" else MemoryStore()
+
+def simulate(bank, bp, sessions, answers, store, timer=None):
+    """Run the workload; returns the live Session objects."""
+    run = timer or (lambda op, fn, *a, **kw: fn(*a, **kw))
+    rng = random.Random(0)
+    learners, modes = [], []
+    for u in range(sessions):
+        s = run("open", Session, bank, f"u{u}", store)
+        chapters = rng.sample(CHAPTERS, 2)
+        pool = run("pool", build_pool, bank, chapters, limit=max(answers, 50), order="rand", rng=rng)
+        learners.append(s)
+        modes.append(PracticeMode(s, "随机练习", pool))
+    for step in range(answers):
+        for pm in modes:
+            i = pm.current()
+            if i is None: continue
+            q = pm.session.bank[i]
+            choice = q["answer"] if step % 10 else q["options"][-1]
+            run("submit", pm.submit, choice)
+            pm.advance()
+        store.maybe_flush()
+    for s in learners:
+        rp = ReviewPractice(s, "错题重练", "review")
+        i = run("review", rp.current)
+        if i is not None: rp.submit(bank[i]["answer"])
+        exam = run("exam_start", ExamSession.start, s, bp, seed=s.user)
+        for j in exam.pool[::2]:
+            exam.answer(j, bank[j]["answer"])
+        run("exam_submit", exam.submit)
+    store.flush()
+    return learners
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--sessions", type=int, default=2000)
+    ap.add_argument("--answers", type=int, default=20)
+    ap.add_argument("--store", choices=("memory", "sqlite"), default="memory")
+    args = ap.parse_args()
+    bp = load_blueprint(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blueprint.json"))
+    for n in (int(x) for x in args.sizes.split(",")):
+        bank = QuestionBank(synthetic_bank(n)).freeze()
+        with tempfile.TemporaryDirectory() as tmp:
+            timer = Timer()
+            t0 = time.perf_counter()
+            simulate(bank, bp, args.sessions, args.answers, open_store(args.store, tmp), timer)
+            wall = time.perf_counter() - t0
+        with tempfile.TemporaryDirectory() as tmp:
+            store = open_store(args.store, tmp)
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            learners = simulate(bank, bp, args.sessions, args.answers, store)
+            held, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del learners
+            store.close()
+        print(f"\nbank={n} sessions={args.sessions} answers/session={args.answers} store={args.store} wall={wall:.2f}s")
+        print(f"  heap {(held - base) / 1024 / args.sessions:.1f} KiB/session, peak {(peak - base) / 2**20:.1f} MiB")
+        print(f"  {'op':<12} {'calls':>7} {'p50(ms)':>8} {'p95(ms)':>8} {'max(ms)':>8}")
+        for op in OPS:
+            times = sorted(timer.times[op])
+            if not times: continue
+            print(f"  {op:<12} {len(times):>7} {statistics.median(times):>8.3f} {percentile(times, .95):>8.3f} {times[-1]:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Exam generation time versus bank size.
+
+    python benchmarks/bench_exam.py [--sizes 1000,10000,100000] [--repeat 50]
+
+Generation samples each blueprint stratum from the precomputed index, so the
+per-paper time should stay flat while the bank grows; index build and
+near-duplicate clustering times are reported separately because they are paid
+once per process.
+"""
+import argparse, os, statistics, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from quiz import QuestionBank
+from quiz.exam import generate_exam, load_blueprint
+from synth import percentile, synthetic_bank
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+    bp = load_blueprint(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blueprint.json"))
+    print(f"{'bank':>8} {'index(s)':>9} {'dedup(s)':>9} {'p50(ms)':>8} {'p95(ms)':>8} {'paper':>6}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        t0 = time.perf_counter()
+        bank = QuestionBank(synthetic_bank(n))
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        bank.clusters
+        dedup = time.perf_counter() - t0
+        times = []
+        for seed in range(args.repeat):
+            t0 = time.perf_counter()
+            paper = generate_exam(bank, bp, seed=seed)
+            times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        print(f"{n:>8} {build:>9.2f} {dedup:>9.2f} {statistics.median(times):>8.3f} {percentile(times, .95):>8.3f} {len(paper):>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Search index build time and query latency versus bank size.
+
+    python benchmarks/bench_search.py [--sizes 1000,10000,100000] [--repeat 20]
+
+Queries mix a rare number, CJK bigrams present in every synthetic question,
+an ASCII prefix and a misspelling, so both the early-stopping impact-ordered
+walk and the full accumulation it falls back to are timed.
+"""
+import argparse, os, statistics, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from quiz import QuestionBank
+from quiz.search import SearchIndex
+from synth import percentile, synthetic_bank
+
+QUERIES = ["合成题 777", "选择题", "合成", "t1", "t17 合成题", "777", "t3x"]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("-k", type=int, default=50)
+    args = ap.parse_args()
+    print(f"{'bank':>8} {'index(s)':>9} {'terms':>7} {'p50(ms)':>8} {'p95(ms)':>8} {'max(ms)':>8}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        bank = QuestionBank(synthetic_bank(n)).freeze()
+        t0 = time.perf_counter()
+        ix = SearchIndex.from_bank(bank)
+        build = time.perf_counter() - t0
+        times = []
+        for _ in range(args.repeat):
+            for q in QUERIES:
+                t0 = time.perf_counter()
+                ix.search(q, args.k)
+                times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        print(f"{n:>8} {build:>9.2f} {len(ix.vocab):>7} {statistics.median(times):>8.3f} "
+              f"{percentile(times, .95):>8.3f} {times[-1]:>8.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Synthetic banks and timing helpers shared by the benchmark scripts."""
+import random
+
+from quiz import normalize_q
+
+CHAPTERS = ["法律责任与合规", "附录·计算公式", "税费与登记", "第一章 新房买卖·流程与规则"]
+
+def synthetic_bank(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    qs = []
+    for i in range(n):
+        ch = rng.choice(CHAPTERS)
+        qs.append(normalize_q({
+            "chapter": ch, "section": f"{ch}·{rng.randrange(20)}", "type": "mcq",
+            "difficulty": rng.randint(1, 5), "tags": [f"t{rng.randrange(40)}"],
+            "question": f"【选择题】合成题 {i}", "options": ["A", "B", "C", "D"], "answer": "A",
+        }))
+    return qs
+
+def percentile(sorted_times, p: float):
+    return sorted_times[min(len(sorted_times) - 1, int(len(sorted_times) * p))] if sorted_times else 0.0
@@ -0,0 +1,3 @@
+from .bank import QuestionBank, qkey, is_mcq, normalize_q
+
+__all__ = ["QuestionBank", "qkey", "is_mcq", "normalize_q"]
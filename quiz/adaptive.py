@@ -0,0 +1,187 @@
+"""Adaptive question selection from an online estimate of the learner's skill.
+
+The model is one-parameter IRT: a learner answers a question correctly with
+probability ``sigmoid(ability - difficulty)``. Ability is the learner's skill
+on the question's chapter plus the mean skill on its tags, kept per learner
+and nudged Elo-style after every answer. Difficulty comes from the
+question's 1-5 ``difficulty`` field. The next question is the one whose
+answer tells us the most: Fisher information ``p * (1 - p)`` peaks where
+``p = 0.5``, so we serve the difficulty closest to the current skill, in the
+chapters that are not mastered yet.
+"""
+import math, random
+from bisect import bisect_left
+
+SCALE = 0.6              # logit per difficulty step; difficulty 3 is "average"
+K0, K_MIN = 0.4, 0.08    # Elo step for a fresh skill, and its floor as evidence piles up
+MASTERY = 0.8            # predicted accuracy on a chapter's hardest level that counts as mastered
+MIN_EVIDENCE = 5         # answers in a chapter before it can count as mastered
+MASTERED_WEIGHT = 0.1    # mastered chapters still come up now and then
+PROBES = 8               # random draws from a pool before falling back to a scan
+
+def item_logit(d) -> float:
+    try:
+        return (float(d) - 3) * SCALE
+    except (TypeError, ValueError):
+        return 0.0
+
+def p_correct(ability: float, difficulty: float) -> float:
+    return 1 / (1 + math.exp(difficulty - ability))
+
+
+class SkillModel:
+    """One learner's skill per chapter and per tag, on the logit scale.
+
+    Each answer moves every skill involved by ``k * (ok - p)``, split evenly
+    across the question's tags. ``k`` shrinks as answers accumulate so the
+    estimate settles instead of chasing every answer.
+    """
+
+    def __init__(self):
+        self.theta = {}   # ("chapter", name) or ("tag", name) -> skill
+        self.n = {}
+
+    def ability(self, chapter, tags=()) -> float:
+        a = self.theta.get(("chapter", chapter), 0.0)
+        if tags:
+            a += sum(self.theta.get(("tag", t), 0.0) for t in tags) / len(tags)
+        return a
+
+    def expect(self, q) -> float:
+        """Predicted chance of answering ``q`` correctly."""
+        return p_correct(self.ability(q.get("chapter",""), q.get("tags", ())), item_logit(q.get("difficulty")))
+
+    def _step(self, key, g):
+        n = self.n.get(key, 0)
+        self.theta[key] = self.theta.get(key, 0.0) + max(K_MIN, K0 / (1 + n / 10)) * g
+        self.n[key] = n + 1
+
+    def record(self, q, ok):
+        g = (1.0 if ok else 0.0) - self.expect(q)
+        self._step(("chapter", q.get("chapter","")), g)
+        tags = q.get("tags", ())
+        for t in tags:
+            self._step(("tag", t), g / len(tags))
+
+    def evidence(self, chapter) -> int:
+        return self.n.get(("chapter", chapter), 0)
+
+    @classmethod
+    def from_history(cls, history, bank):
+        model = cls()
+        for i, ok, ts in history.events():
+            if i >= 0: model.record(bank[i], ok)
+        return model
+
+
+class DifficultyBuckets:
+    """MCQ bitsets per chapter and difficulty level, built once per bank.
+
+    ``levels[ch]`` holds the chapter's distinct difficulty logits in sorted
+    order, so the bucket nearest a target skill is one bisect away;
+    ``mask[(ch, level)]`` is that bucket as a bank bitset, ready to AND
+    with a filter.
+    """
+
+    def __init__(self, bank):
+        groups = {}
+        for ch, d, tp in bank.strata:
+            groups.setdefault(ch, {}).setdefault(item_logit(d), set()).add(d)
+        self.levels = {ch: tuple(sorted(g)) for ch, g in groups.items()}
+        self.mask = {}
+        for ch, g in groups.items():
+            for b, ds in g.items():
+                m = 0
+                for d in ds: m |= bank.difficulty_mask[d]
+                self.mask[(ch, b)] = m & bank.chapter_mask[ch] & bank.mcq_mask
+
+    def nearest(self, chapter, target):
+        """The chapter's difficulty levels, closest to ``target`` first."""
+        levels = self.levels.get(chapter, ())
+        hi = bisect_left(levels, target)
+        lo = hi - 1
+        while lo >= 0 or hi < len(levels):
+            if hi >= len(levels) or (lo >= 0 and target - levels[lo] <= levels[hi] - target):
+                yield levels[lo]; lo -= 1
+            else:
+                yield levels[hi]; hi += 1
+
+
+class AdaptiveSelector:
+    """Picks the next question for one filter combination (a ``QuestionBank.select`` mask).
+
+    A chapter is drawn with probability proportional to the information its
+    best-matched difficulty level would give (mastered chapters are damped),
+    then a question is probed at random from the nearest levels. Each level's
+    pool is the bucket bitset ANDed with the filter once, on first use, so a
+    probe is a tuple lookup however sparse the filter is. Questions
+    only ever answered correctly and the near-duplicate cluster just served
+    are avoided when random probes find something else; questions already
+    served this round are avoided whenever any are left.
+    """
+
+    def __init__(self, bank, mask, tags=()):
+        self.bank = bank
+        self.mask = mask
+        self.tags = tuple(tags)
+        self.buckets = bank.difficulty_buckets
+        self.chapters = [ch for ch, cm in bank.chapter_mask.items() if mask & cm]
+        self._pools = {}   # (chapter, level) -> filtered indices, ascending
+
+    def _weight(self, skill, ch):
+        levels = self.buckets.levels.get(ch)
+        if not levels: return 0.0
+        theta = skill.ability(ch, self.tags)
+        b = next(self.buckets.nearest(ch, theta))
+        w = p_correct(theta, b) * (1 - p_correct(theta, b))
+        if skill.evidence(ch) >= MIN_EVIDENCE and p_correct(theta, levels[-1]) >= MASTERY:
+            w *= MASTERED_WEIGHT
+        return w
+
+    def _pool(self, ch, level):
+        pool = self._pools.get((ch, level))
+        if pool is None:
+            pool = self._pools[(ch, level)] = tuple(self.bank.indices(self.mask & self.buckets.mask[(ch, level)]))
+        return pool
+
+    def _find(self, ch, target, ok, prefer, scan, rng):
+        for level in self.buckets.nearest(ch, target):
+            pool = self._pool(ch, level)
+            if not pool: continue
+            second = None
+            for _ in range(PROBES):
+                i = pool[rng.randrange(len(pool))]
+                if ok(i):
+                    if prefer is None or prefer(i): return i
+                    if second is None: second = i
+            if second is not None: return second
+            if not scan: continue
+            start = rng.randrange(len(pool))
+            for i in pool[start:] + pool[:start]:
+                if ok(i): return i
+        return None
+
+    def next(self, skill, per_q=None, exclude=(), last=None, rng=random):
+        """Bank index of the next question, or None if the mask is empty."""
+        if not self.chapters: return None
+        per_q = per_q or {}
+        clusters = self.bank.clusters
+        last_cluster = clusters[last] if last is not None else None
+        known = lambda i: (c := per_q.get(i)) is not None and c[0] == c[1]
+        # Soft preferences are only probed for; scanning a whole bucket is kept for the last resorts.
+        other_cluster = lambda i: clusters[i] != last_cluster
+        rules = ((lambda i: i not in exclude and not known(i), other_cluster, False),
+                 (lambda i: i not in exclude, other_cluster, True),
+                 (lambda i: True, None, True))
+        weights = [self._weight(skill, ch) + 1e-6 for ch in self.chapters]
+        order = []
+        pool = list(range(len(self.chapters)))
+        while pool:   # weighted draw without replacement, so a drained chapter falls through to the next
+            j = rng.choices(range(len(pool)), weights=[weights[k] for k in pool])[0]
+            order.append(pool.pop(j))
+        for ok, prefer, scan in rules:
+            for k in order:
+                ch = self.chapters[k]
+                i = self._find(ch, skill.ability(ch, self.tags), ok, prefer, scan, rng)
+                if i is not None: return i
+        return None
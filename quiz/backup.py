@@ -0,0 +1,95 @@
+import gzip, io, json, zlib
+
+from .jsonstream import JsonStream
+
+FORMATS = {"json": ("my_progress.json", "application/json"),
+           "json.gz": ("my_progress.json.gz", "application/gzip")}
+
+def encode_backup(data: dict, fmt="json") -> bytes:
+    """Minified JSON (optionally gzipped) in the same shape as older backups."""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if fmt == "json.gz":
+        return gzip.compress(raw, compresslevel=6)
+    if fmt != "json":
+        raise ValueError(f"unknown backup format: {fmt}")
+    return raw
+
+
+def iter_backup(fp):
+    """Stream a backup as ``(section, item)`` events without loading it whole.
+
+    Arrays yield one event per element, objects one ``(key, value)`` pair per
+    entry, scalars a single event. Gzipped uploads are detected by magic bytes.
+    """
+    head = fp.read(2)
+    fp.seek(0)
+    if head == b"\x1f\x8b":
+        fp = gzip.GzipFile(fileobj=fp)
+    s = JsonStream(io.TextIOWrapper(fp, encoding="utf-8"), what="backup")
+    s.expect("{")
+    if s.peek() == "}": return
+    while True:
+        key = s.value()
+        s.expect(":")
+        c = s.peek()
+        if c in "[{":
+            s.pos += 1
+            close = "]" if c == "[" else "}"
+            if s.peek() != close:
+                while True:
+                    if c == "[":
+                        yield key, s.value()
+                    else:
+                        k = s.value(); s.expect(":")
+                        yield key, (k, s.value())
+                    if s.peek() == ",": s.pos += 1
+                    else: break
+            s.expect(close)
+        else:
+            yield key, s.value()
+        if s.peek() == ",": s.pos += 1
+        else: break
+    s.expect("}")
+
+
+def _valid_row(r):
+    return (isinstance(r, (list, tuple)) and len(r) == 4 and isinstance(r[0], str)
+            and isinstance(r[1], (bool, int)) and isinstance(r[3], str))
+
+_CHECKS = {
+    "history": _valid_row,
+    "wrong_ids": lambda v: isinstance(v, str),
+    # Object entries arrive as (key, value) tuples; a non-object section yields bare values.
+    "wrong_count": lambda kv: (isinstance(kv, tuple) and isinstance(kv[0], str) and isinstance(kv[1], int)
+                               and not isinstance(kv[1], bool) and kv[1] >= 0),
+    "favorites": lambda v: isinstance(v, str),
+    "exam_records": lambda v: isinstance(v, dict),
+}
+
+def read_backup(fp, on_chunk=None, chunk_size=2000):
+    """Validate and collect a streamed backup into the ``ProgressStore.load`` shape.
+
+    Invalid entries are skipped and counted; unknown sections are ignored.
+    A blob that is not a backup at all, including a truncated or corrupt
+    gzip upload, raises ValueError.
+    ``on_chunk(items_read)`` is called every ``chunk_size`` items so callers
+    can report progress. Returns ``(data, skipped)``.
+    """
+    data = {"history": [], "wrong_ids": [], "wrong_count": {}, "favorites": [], "exam_records": []}
+    skipped = n = 0
+    try:
+        for key, item in iter_backup(fp):
+            check = _CHECKS.get(key)
+            if check is None: continue
+            n += 1
+            if on_chunk and n % chunk_size == 0: on_chunk(n)
+            if not check(item):
+                skipped += 1
+                continue
+            if key == "wrong_count": data[key][item[0]] = item[1]
+            elif key == "history": data[key].append(tuple(item))
+            else: data[key].append(item)
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        raise ValueError(f"invalid backup: {e}") from e
+    if on_chunk: on_chunk(n)
+    return data, skipped
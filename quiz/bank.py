@@ -0,0 +1,214 @@
+import hashlib, random
+from types import MappingProxyType
+
+from .adaptive import DifficultyBuckets
+from .dedup import cluster_ids
+from .facets import Facets
+from .search import SearchIndex
+
+def qkey(q: dict) -> str:
+    raw = f"{q.get('chapter','')}|{q.get('section','')}|{q.get('question','')}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+def is_mcq(q: dict) -> bool:
+    return isinstance(q.get("options"), (list, tuple)) and len(q["options"]) >= 2
+
+def normalize_q(q: dict) -> dict:
+    q = dict(q)
+    q.setdefault("chapter","")
+    q.setdefault("section","")
+    q.setdefault("type","mcq" if is_mcq(q) else "qa")
+    q.setdefault("difficulty",3)
+    q.setdefault("tags",[])
+    q.setdefault("answer","")
+    q.setdefault("explanation","")
+    return q
+
+def iter_bits(mask: int, limit=None):
+    """Yield the positions of set bits in ``mask``, lowest first."""
+    bits = bin(mask)[:1:-1]
+    i = bits.find("1")
+    while i != -1 and limit != 0:
+        yield i
+        if limit is not None: limit -= 1
+        i = bits.find("1", i + 1)
+
+def mask_of(indices, size: int) -> int:
+    """Pack an iterable of positions into an int bitset in one pass."""
+    buf = bytearray((size + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+def _or(masks, keys):
+    m = 0
+    for k in keys:
+        m |= masks.get(k, 0)
+    return m
+
+
+class QuestionBank:
+    """Load-time index over a normalized question list.
+
+    Every question gets its stable ID (``qkey``) exactly once, stored on the
+    question as ``q["id"]``, so lookups by ID (``pos``) are plain dict hits
+    instead of rehashing the whole bank on each rerun.
+
+    Filtering uses membership masks: one Python int per chapter, section,
+    tag, difficulty and type, with bit ``i`` set when question ``i`` belongs
+    to it. A sidebar filter combination resolves to a pool with a handful of
+    big-int AND/OR operations, independent of how many predicates apply.
+    """
+
+    def __init__(self, questions, load_errors=()):
+        self.load_errors = list(load_errors)
+        self.questions = []
+        self.ids = []
+        self.pos = {}            # qid -> position in self.questions
+        self.by_chapter = {}     # chapter -> its sections, in first-seen order
+        self.strata = {}         # (chapter, difficulty, type) -> [index], MCQ only
+        self.aliases = {}        # former qid -> current qid, for questions folded into templates
+        members = {"chapter": {}, "section": {}, "tag": {}, "difficulty": {}, "type": {}}
+        mcq = []
+        for q in questions:
+            if isinstance(q, dict):
+                q = dict(q)
+                qid = q.setdefault("id", qkey(q))
+            else:
+                qid = q["id"]  # read-only views (template variants) carry their own ID
+                old = getattr(q, "legacy_id", None)
+                if old: self.aliases[old] = qid
+            i = len(self.questions)
+            self.pos[qid] = i
+            self.questions.append(q)
+            self.ids.append(qid)
+            ch, sec = q.get("chapter",""), q.get("section","")
+            d, tp = q.get("difficulty"), q.get("type","")
+            self.by_chapter.setdefault(ch, {})[sec] = None
+            members["chapter"].setdefault(ch, []).append(i)
+            members["section"].setdefault(sec, []).append(i)
+            members["difficulty"].setdefault(d, []).append(i)
+            members["type"].setdefault(tp, []).append(i)
+            for t in q.get("tags", []):
+                members["tag"].setdefault(t, []).append(i)
+            if is_mcq(q):
+                mcq.append(i)
+                self.strata.setdefault((ch, d, tp), []).append(i)
+        n = len(self.questions)
+        self.chapter_mask = {k: mask_of(v, n) for k, v in members["chapter"].items()}
+        self.section_mask = {k: mask_of(v, n) for k, v in members["section"].items()}  # keyed by section name, as the sidebar selects them
+        self.tag_mask = {k: mask_of(v, n) for k, v in members["tag"].items()}
+        self.difficulty_mask = {k: mask_of(v, n) for k, v in members["difficulty"].items()}
+        self.type_mask = {k: mask_of(v, n) for k, v in members["type"].items()}
+        self.mcq_mask = mask_of(mcq, n)
+        self.all_mask = (1 << n) - 1
+        self._clusters = None
+        self._search = None
+        self._facets = None
+        self._buckets = None
+
+    def freeze(self):
+        """Make the bank read-only so one instance can be shared by every session."""
+        def ro(q):
+            if not isinstance(q, dict): return q
+            q = dict(q)
+            for k in ("options", "tags"):
+                if isinstance(q.get(k), list): q[k] = tuple(q[k])
+            return MappingProxyType(q)
+        self.questions = tuple(ro(q) for q in self.questions)
+        self.ids = tuple(self.ids)
+        self.pos = MappingProxyType(self.pos)
+        self.by_chapter = MappingProxyType({ch: tuple(secs) for ch, secs in self.by_chapter.items()})
+        self.strata = MappingProxyType({k: tuple(v) for k, v in self.strata.items()})
+        self.aliases = MappingProxyType(self.aliases)
+        for name in ("chapter_mask", "section_mask", "tag_mask", "difficulty_mask", "type_mask"):
+            setattr(self, name, MappingProxyType(getattr(self, name)))
+        return self
+
+    @property
+    def clusters(self):
+        """Near-duplicate cluster ID per index (see ``dedup.cluster_ids``), built on first use."""
+        if self._clusters is None:
+            self._clusters = tuple(cluster_ids([q.get("question","") for q in self.questions]))
+        return self._clusters
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """Full-text index over the bank, built on first use and shared like the bank itself."""
+        if self._search is None:
+            self._search = SearchIndex.from_bank(self)
+        return self._search
+
+    @property
+    def facets(self) -> Facets:
+        """Sidebar filter values and counts (see ``facets.Facets``), built on first use."""
+        if self._facets is None:
+            self._facets = Facets(self)
+        return self._facets
+
+    @property
+    def difficulty_buckets(self) -> DifficultyBuckets:
+        """MCQ indices per chapter and difficulty for adaptive practice, built on first use."""
+        if self._buckets is None:
+            self._buckets = DifficultyBuckets(self)
+        return self._buckets
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def __contains__(self, qid):
+        return qid in self.pos
+
+    def __getitem__(self, i):
+        return self.questions[i]
+
+    def canonical(self, qid):
+        """The current ID for ``qid``, which may be an ID the question had before (see ``aliases``)."""
+        return self.aliases.get(qid, qid)
+
+    def pick(self, qids):
+        """Bank indices for ``qids`` in bank order; unknown IDs are dropped."""
+        return sorted(self.pos[qid] for qid in qids if qid in self.pos)
+
+    def select(self, chapters=(), sections=(), tags=(), difficulties=(), types=(), mcq_only=True) -> int:
+        """Mask of questions matching every non-empty filter (any value within a filter).
+
+        Questions without a section always pass the section filter, matching
+        how the sidebar treats chapters that have no sections.
+        """
+        m = self.mcq_mask if mcq_only else self.all_mask
+        if chapters:
+            m &= _or(self.chapter_mask, chapters)
+        if sections:
+            m &= _or(self.section_mask, sections) | self.section_mask.get("", 0)
+        if tags:
+            m &= _or(self.tag_mask, tags)
+        if difficulties:
+            m &= _or(self.difficulty_mask, difficulties)
+        if types:
+            m &= _or(self.type_mask, types)
+        return m
+
+    def indices(self, mask: int, limit=None):
+        return list(iter_bits(mask, limit))
+
+    def sample(self, mask: int, k: int, rng=random):
+        """``k`` distinct random indices from ``mask``.
+
+        Dense masks are sampled by probing random bits, so a 50-question pool
+        from a 100k bank does not materialize every matching index first.
+        """
+        total = mask.bit_count()
+        k = min(k, total)
+        if total < 8 * k or total * 8 < len(self.questions):
+            return rng.sample(self.indices(mask), k)
+        n, out, seen = len(self.questions), [], set()
+        while len(out) < k:
+            r = rng.randrange(n)
+            if r not in seen and mask >> r & 1:
+                seen.add(r)
+                out.append(r)
+        return out
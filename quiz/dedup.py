@@ -0,0 +1,90 @@
+import random, re, zlib
+
+_NUM = re.compile(r"\d+(?:\.\d+)?")
+_SPACE = re.compile(r"\s+")
+_PRIME = (1 << 61) - 1
+
+def normalize_text(text: str) -> str:
+    """Question text with every number replaced by ``#`` and whitespace dropped."""
+    return _SPACE.sub("", _NUM.sub("#", text))
+
+def shingles(text: str, k: int = 3):
+    """Character k-grams; CJK text has no word breaks, so characters are the unit."""
+    if len(text) <= k: return {text}
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+def _perms(n: int):
+    rng = random.Random(1)
+    return [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(n)]
+
+def minhash(sh, perms):
+    hs = [zlib.crc32(s.encode("utf-8")) for s in sh]
+    return tuple(min((a * h + b) % _PRIME for h in hs) for a, b in perms)
+
+def cluster_ids(texts, threshold: float = 0.6, bands: int = 16, rows: int = 4):
+    """Near-duplicate cluster per text, as the smallest index in its cluster.
+
+    Texts equal after ``normalize_text`` (templated variants that differ
+    only in numbers) are merged by hashing. Each distinct template then gets
+    a MinHash signature of its 3-shingles; templates sharing any LSH band
+    are candidates, merged when the Jaccard similarity of their shingles
+    reaches ``threshold``. Work is linear in the number of texts plus one
+    signature per distinct template, with no pairwise comparison.
+    """
+    n = len(texts)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        a, b = find(i), find(j)
+        if a != b:
+            if b < a: a, b = b, a
+            parent[b] = a
+
+    first = {}
+    for i, t in enumerate(texts):
+        norm = normalize_text(t)
+        j = first.setdefault(norm, i)
+        if j != i: union(j, i)
+    perms = _perms(bands * rows)
+    buckets = {}
+    sets = {}
+    for norm, i in first.items():
+        sh = sets[i] = shingles(norm)
+        sig = minhash(sh, perms)
+        for b in range(bands):
+            j = buckets.setdefault((b, sig[b * rows:(b + 1) * rows]), i)
+            if j == i or find(j) == find(i): continue
+            if len(sh & sets[j]) >= threshold * len(sh | sets[j]): union(j, i)
+    return [find(i) for i in range(n)]
+
+def spread(indices, cluster_of, rng=random):
+    """Reorder ``indices`` so items from the same cluster are not adjacent where possible.
+
+    The next cluster is drawn at random, weighted by how many of its items
+    remain, except when the largest cluster must go next to stay separable.
+    Items keep their relative order within a cluster.
+    """
+    groups = {}
+    for i in indices:
+        groups.setdefault(cluster_of[i], []).append(i)
+    if len(groups) in (1, len(indices)): return list(indices)
+    for g in groups.values(): g.reverse()
+    out, last, left = [], None, len(indices)
+    while left:
+        cands = [c for c in groups if c != last] or [last]
+        big = max(cands, key=lambda c: len(groups[c]))
+        if 2 * len(groups[big]) >= left:
+            c = big
+        else:
+            c = rng.choices(cands, weights=[len(groups[c]) for c in cands])[0]
+        g = groups[c]
+        out.append(g.pop())
+        if not g: del groups[c]
+        last, left = c, left - 1
+    return out
@@ -0,0 +1,375 @@
+"""Practice and exam logic without any UI.
+
+The Streamlit app drives these objects; benchmarks and tests drive them
+directly. Everything refers to questions by integer index into a shared,
+frozen ``QuestionBank``; the progress store only ever sees stable IDs.
+"""
+import itertools, random, time
+from collections import defaultdict
+from datetime import datetime
+
+from .adaptive import AdaptiveSelector, SkillModel
+from .dedup import spread
+from .exam import generate_exam
+from .history import HistoryLog, now_epoch
+from .srs import ReviewScheduler
+from .stats import ProgressStats
+
+# Modes served from the spaced-repetition queues rather than a fixed pool.
+REVIEW_QUEUES = {"错题重练": "review", "易错题": "hard"}
+
+def now_iso() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+def check_answer(q, choice) -> bool:
+    # Template variants grade against their computed value.
+    check = getattr(q, "check", None)
+    return check(choice) if check is not None else choice == q.get("answer","")
+
+
+def migrate_progress(data, bank):
+    """``data`` with former question IDs renamed to the bank's current ones, or ``data`` itself if none occur."""
+    c, aliases = bank.canonical, bank.aliases
+    hist, wrong, wc, favs = (data.get(k, e) for k, e in
+                             (("history", []), ("wrong_ids", []), ("wrong_count", {}), ("favorites", [])))
+    if not aliases or not any(qid in aliases for qid in
+                              itertools.chain((h[0] for h in hist), wrong, wc, favs)):
+        return data
+    counts = {}
+    for qid, n in wc.items():
+        counts[c(qid)] = counts.get(c(qid), 0) + n
+    return {**data, "history": [(c(h[0]), *h[1:]) for h in hist],
+            "wrong_ids": list(dict.fromkeys(map(c, wrong))), "wrong_count": counts,
+            "favorites": list(dict.fromkeys(map(c, favs)))}
+
+
+class Session:
+    """One learner's progress on one bank."""
+
+    def __init__(self, bank, user, store, history_max_chunks=None):
+        self.bank = bank
+        self.user = user
+        self.store = store
+        self.history_max_chunks = history_max_chunks
+        data = store.load(user)
+        migrated = migrate_progress(data, bank)
+        if migrated is not data:
+            # Rewrite once, so later toggles and dismissals under the new IDs are not undone on reload.
+            store.replace(user, migrated)
+        self.load(migrated)
+
+    def load(self, data):
+        """Adopt stored progress; entries for questions outside the bank stay in the store only."""
+        bank, pos = self.bank, self.bank.pos
+        data = migrate_progress(data, bank)
+        self.history = HistoryLog.from_legacy(data.get("history", []), bank, max_chunks=self.history_max_chunks)
+        self.wrong_count = defaultdict(int, {pos[qid]: n for qid, n in data.get("wrong_count", {}).items() if qid in pos})
+        self.favorites = set(bank.pick(data.get("favorites", [])))
+        self.exam_records = list(data.get("exam_records", []))
+        self.stats = ProgressStats.from_history(self.history, bank)
+        self.skill = SkillModel.from_history(self.history, bank)
+        self.srs = ReviewScheduler.from_progress(self.history.events(), bank.pick(data.get("wrong_ids", [])),
+                                                 self.wrong_count, known=range(len(bank)), now=now_epoch())
+
+    def restore(self, data):
+        data = migrate_progress(data, self.bank)  # backups made before a question moved into a template
+        self.store.replace(self.user, data)
+        self.load(data)
+
+    def record_answer(self, i, ok, mode, ts=None):
+        """Apply one graded answer to every aggregate and to the store."""
+        q = self.bank[i]
+        qid = q["id"]
+        ts = ts or now_iso()
+        was_wrong = self.srs.contains(i)
+        self.srs.answer(i, ok, now_epoch())
+        if not ok:
+            self.wrong_count[i] += 1
+            self.store.add_wrong_count(self.user, qid)
+        if self.srs.contains(i) != was_wrong:
+            self.store.set_wrong(self.user, qid, not was_wrong)
+        self.history.append(qid, ok, ts, mode)
+        self.stats.record(i, ok, q)
+        self.skill.record(q, ok)
+        self.store.append_answer(self.user, qid, ok, ts, mode)
+
+    def toggle_favorite(self, i) -> bool:
+        on = i not in self.favorites
+        if on: self.favorites.add(i)
+        else: self.favorites.discard(i)
+        self.store.set_favorite(self.user, self.bank[i]["id"], on)
+        return on
+
+    def dismiss(self, i, queue="review"):
+        """Take ``i`` out of the wrong-question queue; from 易错题 also forget its misses."""
+        qid = self.bank[i]["id"]
+        if self.srs.contains(i):
+            self.srs.remove(i)
+            self.store.set_wrong(self.user, qid, False)
+        if queue == "hard":
+            self.srs.reset_lapses(i)
+            self.store.add_wrong_count(self.user, qid, -self.wrong_count.pop(i, 0))
+
+    def add_exam_record(self, rec):
+        self.exam_records.append(rec)
+        self.store.add_exam_record(self.user, rec)
+
+
+def build_pool(bank, chapters=(), sections=(), tags=(), limit=50, order="seq", rng=random):
+    """Bank indices for a filter combination: the first ``limit`` in bank order, or a random sample.
+
+    Random pools are ordered so near-duplicates are not served back to back.
+    """
+    mask = bank.select(chapters=chapters, sections=sections, tags=tags)
+    if order == "rand":
+        return spread(bank.sample(mask, limit, rng), bank.clusters, rng)
+    return bank.indices(mask, limit=limit)
+
+
+class PracticeMode:
+    """A fixed pool walked front to back."""
+
+    def __init__(self, session, name, pool=()):
+        self.session = session
+        self.name = name
+        self.pool = list(pool)
+        self.pos = 0
+
+    def items(self):
+        return self.pool
+
+    def __len__(self):
+        return len(self.items())
+
+    def current(self):
+        items = self.items()
+        if not items: return None
+        self.pos = max(0, min(self.pos, len(items) - 1))
+        return items[self.pos]
+
+    def advance(self):
+        self.pos = min(self.pos + 1, max(0, len(self) - 1))
+
+    def skip(self):
+        self.advance()
+
+    def submit(self, choice) -> bool:
+        i = self.current()
+        ok = check_answer(self.session.bank[i], choice)
+        self.session.record_answer(i, ok, self.name)
+        return ok
+
+class FavoritesPractice(PracticeMode):
+    """Favorites in bank order, re-read on every access so toggles show up at once."""
+
+    def items(self):
+        return sorted(self.session.favorites)
+
+class AdaptivePractice(PracticeMode):
+    """Picks each question when it is reached, from the learner's current skill (see ``adaptive``).
+
+    ``limit`` questions make a round; nothing repeats within a round.
+    """
+
+    def __init__(self, session, name, chapters=(), sections=(), tags=(), limit=50, rng=random):
+        super().__init__(session, name)
+        mask = session.bank.select(chapters=chapters, sections=sections, tags=tags)
+        self.selector = AdaptiveSelector(session.bank, mask, tags)
+        self.limit = min(limit, mask.bit_count())
+        self.rng = rng
+        self._served = set()
+        self._cur = None
+
+    def __len__(self):
+        return self.limit
+
+    def current(self):
+        if self._cur is None and self.limit:
+            s = self.session
+            self._cur = self.selector.next(s.skill, s.stats.per_q, self._served,
+                                           self.pool[-1] if self.pool else None, self.rng)
+            if self._cur is not None:
+                self.pool.append(self._cur)
+                self._served.add(self._cur)
+        return self._cur
+
+    def advance(self):
+        if self._cur is None: return
+        self._cur = None
+        self.pos += 1
+        if self.pos >= self.limit:
+            self.pos = 0
+            self.pool, self._served = [], set()
+
+class ReviewPractice(PracticeMode):
+    """Always serves the head of a spaced-repetition queue."""
+
+    def __init__(self, session, name, queue):
+        super().__init__(session, name)
+        self.queue = queue
+
+    def __len__(self):
+        return self.session.srs.size(self.queue)
+
+    def current(self):
+        return self.session.srs.peek(self.queue)
+
+    def skip(self):
+        i = self.current()
+        if i is not None: self.session.srs.defer(i, self.queue)
+        self.advance()
+
+    def dismiss(self):
+        i = self.current()
+        if i is not None: self.session.dismiss(i, self.queue)
+
+
+class ExamSession:
+    """One timed paper: answers are kept silently and graded once on submit.
+
+    States go ``running`` -> ``submitted`` and never back. While running,
+    answers are checkpointed to the store at most every ``CHECKPOINT_SEC``
+    seconds (and only when something changed), so a reload or a new worker
+    resumes the same paper with the same clock; ``tick`` submits the paper
+    once time runs out. Each paper has an ID (``paper``); submitting claims
+    the stored paper by that ID in the same store batch as the grading, so a
+    paper open in two tabs or workers is recorded exactly once.
+    """
+
+    RUNNING, SUBMITTED = "running", "submitted"
+    CHECKPOINT_SEC = 10
+
+    def __init__(self, session, pool, seed=None, duration_sec=3600, pass_line=60, start_ts=None,
+                 bank_name=None, answers=None, pos=0, paper=None):
+        self.session = session
+        self.pool = list(pool)
+        self.seed = seed
+        self.duration_sec = int(duration_sec)
+        self.pass_line = pass_line
+        self.start_ts = time.time() if start_ts is None else start_ts
+        self.paper = paper or f"{seed or ''}@{self.start_ts!r}"
+        self.bank_name = bank_name
+        self.answers = dict(answers or {})
+        self.pos = pos
+        self.state = self.RUNNING
+        self.result = None
+        self._dirty = True
+        self._saved_at = float("-inf")
+
+    @classmethod
+    def start(cls, session, blueprint, total=None, seed=None, duration_sec=None, pass_line=None,
+              bank_name=None, now=None):
+        """Generate a paper from ``blueprint`` and checkpoint it right away."""
+        exam = cls(session, generate_exam(session.bank, blueprint, seed=seed, total=total), seed=seed,
+                   duration_sec=duration_sec if duration_sec is not None else blueprint.get("time_limit_minutes", 60) * 60,
+                   pass_line=pass_line if pass_line is not None else blueprint.get("pass_score", 60),
+                   start_ts=now, bank_name=bank_name)
+        exam.checkpoint(now, force=True, create=True)
+        return exam
+
+    @classmethod
+    def resume(cls, session, bank_name=None, now=None):
+        """The learner's unfinished paper on this bank, or None; an expired one is submitted first."""
+        state = session.store.load_exam(session.user)
+        if not state or state.get("bank") != bank_name: return None
+        pos, c = session.bank.pos, session.bank.canonical
+        if not all(c(qid) in pos for qid in state["pool"]):
+            session.store.clear_exam(session.user)  # the bank changed under the paper
+            return None
+        exam = cls(session, [pos[c(qid)] for qid in state["pool"]], seed=state.get("seed"),
+                   duration_sec=state["duration_sec"], pass_line=state["pass_line"], start_ts=state["start_ts"],
+                   bank_name=bank_name, answers={pos[c(qid)]: a for qid, a in state.get("answers", {}).items()},
+                   pos=state.get("pos", 0), paper=state.get("paper"))
+        if "paper" not in state:   # saved before papers had IDs
+            exam.checkpoint(now, force=True, create=True)
+        exam._dirty = False
+        exam.tick(now)
+        return exam
+
+    def to_state(self) -> dict:
+        ids = self.session.bank.ids
+        return {"bank": self.bank_name, "seed": self.seed, "pool": [ids[i] for i in self.pool],
+                "answers": {ids[i]: c for i, c in self.answers.items()}, "start_ts": self.start_ts,
+                "duration_sec": self.duration_sec, "pass_line": self.pass_line, "pos": self.pos,
+                "paper": self.paper}
+
+    def checkpoint(self, now=None, force=False, create=False):
+        """Save progress; only ``create`` replaces a different paper (e.g. one submitted elsewhere)."""
+        if self.state != self.RUNNING or not (self._dirty or force): return
+        now = time.time() if now is None else now
+        if force or now - self._saved_at >= self.CHECKPOINT_SEC:
+            self.session.store.save_exam(self.session.user, self.to_state(), create=create)
+            self._dirty = False
+            self._saved_at = now
+
+    def __len__(self):
+        return len(self.pool)
+
+    def current(self):
+        return self.pool[self.pos] if self.pool else None
+
+    def answer(self, i, choice) -> bool:
+        """Record ``choice`` for ``i``; returns False (and writes nothing) when it is unchanged."""
+        if self.state != self.RUNNING or self.answers.get(i) == choice: return False
+        self.answers[i] = choice
+        self._dirty = True
+        return True
+
+    def move(self, step):
+        pos = max(0, min(self.pos + step, len(self.pool) - 1))
+        if pos != self.pos:
+            self.pos = pos
+            self._dirty = True
+
+    def remaining(self, now=None) -> int:
+        return self.duration_sec - int((time.time() if now is None else now) - self.start_ts)
+
+    def expired(self, now=None) -> bool:
+        return self.remaining(now) <= 0
+
+    def tick(self, now=None) -> bool:
+        """Advance the clock; returns True if this call auto-submitted the paper."""
+        if self.state == self.RUNNING and self.expired(now):
+            self.submit()
+            return True
+        return False
+
+    @property
+    def submitted(self) -> bool:
+        return self.state == self.SUBMITTED
+
+    def submit(self):
+        """Grade the paper and record it; repeated calls return the first result.
+
+        If the stored paper is already gone (submitted from another tab or
+        worker), nothing is recorded and the result has ``recorded=False``.
+        """
+        if self.result is not None: return self.result
+        bank, s = self.session.bank, self.session
+        ts = now_iso()
+        graded, wrong_detail = [], []
+        for i in self.pool:
+            q = bank[i]
+            sel = self.answers.get(i)
+            ok = check_answer(q, sel)
+            graded.append((i, ok))
+            if not ok:
+                wrong_detail.append({"index": i, "question": q.get("question",""), "selected": sel,
+                                     "answer": q.get("answer",""), "chapter": q.get("chapter",""),
+                                     "section": q.get("section","")})
+        total = len(self.pool)
+        correct = total - len(wrong_detail)
+        score = round(correct / total * 100, 1) if total else 0.0
+        passed = score >= self.pass_line
+        rec = {"timestamp": ts, "score": score, "passed": passed, "total": total, "correct": correct,
+               "wrong": len(wrong_detail), "seed": self.seed or ""}
+        if self.bank_name is not None: rec["bank"] = self.bank_name
+        with s.store.batch():
+            recorded = s.store.claim_exam(s.user, self.paper)
+            if recorded:
+                for i, ok in graded:
+                    s.record_answer(i, ok, "模拟考试", ts)
+                s.add_exam_record(rec)
+        self.state = self.SUBMITTED
+        self.result = {"record": rec, "wrong_detail": wrong_detail, "recorded": recorded}
+        return self.result
@@ -0,0 +1,109 @@
+import json, random
+from bisect import bisect_right
+
+from .dedup import spread
+
+DEFAULT_BLUEPRINT = {"total": 100, "rules": [], "time_limit_minutes": 60, "pass_score": 60}
+
+def load_blueprint(path="blueprint.json") -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    bp = dict(DEFAULT_BLUEPRINT)
+    bp.update(data)
+    return bp
+
+def _as_list(v):
+    if v is None or v == "": return []
+    return list(v) if isinstance(v, (list, tuple, set)) else [v]
+
+def _difficulty_ok(rule_diff, d) -> bool:
+    """Two numbers mean an inclusive range, anything else a set of allowed levels."""
+    vals = _as_list(rule_diff)
+    if not vals: return True
+    if len(vals) == 2 and all(isinstance(v, (int, float)) for v in vals):
+        lo, hi = sorted(vals)
+        return isinstance(d, (int, float)) and lo <= d <= hi
+    return d in vals
+
+def rule_strata(bank, rule):
+    """Stratum lists of ``bank`` that a blueprint rule draws from."""
+    chs, tps = set(_as_list(rule.get("chapter"))), set(_as_list(rule.get("type")))
+    return [lst for (ch, d, tp), lst in bank.strata.items()
+            if (not chs or ch in chs) and (not tps or tp in tps) and _difficulty_ok(rule.get("difficulty"), d)]
+
+
+class _Population:
+    """Several index lists viewed as one sequence, without concatenating them."""
+
+    def __init__(self, lists):
+        self.lists = [l for l in lists if l]
+        self.offsets = []
+        n = 0
+        for l in self.lists:
+            self.offsets.append(n)
+            n += len(l)
+        self.size = n
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, k):
+        j = bisect_right(self.offsets, k) - 1
+        return self.lists[j][k - self.offsets[j]]
+
+def sparse_shuffle(n: int, rng):
+    """Partial Fisher-Yates over range(n): yields a random permutation lazily.
+
+    Only swapped slots are remembered, so drawing k items costs O(k) time and
+    memory however large n is.
+    """
+    swaps = {}
+    for i in range(n):
+        j = rng.randrange(i, n)
+        yield swaps.get(j, j)
+        swaps[j] = swaps.get(i, i)
+        swaps.pop(i, None)
+
+def _draw(pop, k, rng, taken):
+    out = []
+    if k <= 0: return out
+    for pos in sparse_shuffle(len(pop), rng):
+        i = pop[pos]
+        if i in taken: continue
+        taken.add(i); out.append(i)
+        if len(out) == k: break
+    return out
+
+def _scaled_counts(counts, total):
+    """Shrink rule quotas to ``total`` by largest remainder, keeping proportions."""
+    s = sum(counts)
+    if total >= s: return list(counts)
+    exact = [c * total / s for c in counts]
+    out = [int(x) for x in exact]
+    order = sorted(range(len(counts)), key=lambda j: exact[j] - out[j], reverse=True)
+    for j in order[:total - sum(out)]:
+        out[j] += 1
+    return out
+
+def generate_exam(bank, blueprint: dict, seed=None, total=None):
+    """Assemble an exam paper as a list of bank indices.
+
+    Each blueprint rule is sampled from its strata; quotas a stratum cannot
+    fill, and any remainder up to ``total``, come from the rest of the MCQ
+    bank. The same ``seed`` on the same bank always yields the same paper.
+    Near-duplicate questions (same ``bank.clusters`` ID) are kept apart.
+    """
+    rng = random.Random(seed)
+    rules = blueprint.get("rules", [])
+    total = int(total if total is not None else blueprint.get("total") or sum(r.get("count", 0) for r in rules))
+    counts = _scaled_counts([int(r.get("count", 0)) for r in rules], total)
+    taken, paper = set(), []
+    for rule, k in zip(rules, counts):
+        paper += _draw(_Population(rule_strata(bank, rule)), k, rng, taken)
+    if len(paper) < total:
+        paper += _draw(_Population(bank.strata.values()), total - len(paper), rng, taken)
+    rng.shuffle(paper)
+    return spread(paper, bank.clusters, rng)
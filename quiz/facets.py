@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+DIMENSIONS = ("chapter", "section", "tag", "difficulty")
+
+def _value_key(v):
+    # Difficulties are usually ints; anything else sorts after them as text.
+    return (0, v, "") if isinstance(v, (int, float)) else (1, 0, str(v))
+
+
+class Facets:
+    """Sidebar filter values and live counts for one frozen bank.
+
+    The values (chapters, sections per chapter, tags, difficulties) are read
+    off the bank's indexes once. Counts follow the faceted-search rule: each
+    dimension is counted under every *other* active filter, so the chapter
+    counts show what picking a chapter would yield given the chosen sections
+    and tags. A count is the popcount of two ANDed membership masks, so no
+    question is rescanned, and results are memoized per filter combination.
+    """
+
+    def __init__(self, bank, cache_size=256):
+        self.bank = bank
+        self.chapters = sorted(ch for ch in bank.chapter_mask if ch)
+        self.sections_by_ch = {ch: tuple(sorted(s for s in secs if s)) for ch, secs in bank.by_chapter.items() if ch}
+        self.tags = sorted(bank.tag_mask)
+        self.difficulties = sorted(bank.difficulty_mask, key=_value_key)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sections(self, chapters):
+        """Named sections of ``chapters``, sorted."""
+        return sorted({s for ch in chapters for s in self.sections_by_ch.get(ch, ())})
+
+    def counts(self, chapters=(), sections=(), tags=(), difficulties=(), mcq_only=True) -> dict:
+        """``{"total": n, "chapter": {value: n}, "section": ..., "tag": ..., "difficulty": ...}``.
+
+        Filters mean the same as in ``QuestionBank.select``: empty is no
+        filter, values within one filter are OR-ed.
+        """
+        key = (tuple(chapters), tuple(sections), tuple(tags), tuple(difficulties), mcq_only)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        b = self.bank
+        sel = dict(zip(("chapters", "sections", "tags", "difficulties"), key[:4]))
+        out = {"total": b.select(mcq_only=mcq_only, **sel).bit_count()}
+        for dim, arg, masks, values in (("chapter", "chapters", b.chapter_mask, self.chapters),
+                                        ("section", "sections", b.section_mask, sorted(s for s in b.section_mask if s)),
+                                        ("tag", "tags", b.tag_mask, self.tags),
+                                        ("difficulty", "difficulties", b.difficulty_mask, self.difficulties)):
+            base = b.select(mcq_only=mcq_only, **{**sel, arg: ()})
+            out[dim] = {v: (base & masks[v]).bit_count() for v in values}
+        with self._lock:
+            self._cache[key] = out
+            if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return out
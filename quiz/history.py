@@ -0,0 +1,158 @@
+import os, struct, tempfile, weakref
+from array import array
+from datetime import datetime, timedelta
+
+MODES = ("顺序练习","随机练习","章节练习","专项练习","错题重练","收藏夹","易错题","模拟考试","成绩记录","进度面板","搜索")
+
+_EPOCH = datetime(1970, 1, 1)
+
+def iso_to_epoch(ts: str) -> int:
+    """Seconds since 1970-01-01 on the wall clock the ISO string was written in."""
+    return (datetime.fromisoformat(ts) - _EPOCH) // timedelta(seconds=1)
+
+def now_epoch() -> int:
+    """Current local wall-clock time on the same scale as ``iso_to_epoch``."""
+    return (datetime.now() - _EPOCH) // timedelta(seconds=1)
+
+def epoch_to_iso(sec: int) -> str:
+    return (_EPOCH + timedelta(seconds=sec)).isoformat(timespec="seconds")
+
+
+class _Chunk:
+    __slots__ = ("q", "ok", "ts", "mode")
+
+    def __init__(self):
+        self.q = array("i")      # bank index, or -(k+1) for the k-th ID not in the bank
+        self.ok = bytearray()
+        self.ts = array("q")     # epoch seconds
+        self.mode = array("B")   # index into HistoryLog.modes
+
+    def __len__(self):
+        return len(self.ok)
+
+    def to_bytes(self) -> bytes:
+        return struct.pack("<I", len(self)) + self.q.tobytes() + bytes(self.ok) + self.ts.tobytes() + self.mode.tobytes()
+
+    @classmethod
+    def from_bytes(cls, buf, off=0):
+        (n,) = struct.unpack_from("<I", buf, off); off += 4
+        c = cls()
+        c.q.frombytes(buf[off:off + 4*n]); off += 4*n
+        c.ok[:] = buf[off:off + n]; off += n
+        c.ts.frombytes(buf[off:off + 8*n]); off += 8*n
+        c.mode.frombytes(buf[off:off + n]); off += n
+        return c, off
+
+
+class HistoryLog:
+    """Columnar answer log: ``(bank index, ok, epoch seconds, mode code)``.
+
+    Rows live in fixed-size chunks of typed arrays (about 14 bytes per answer
+    instead of a tuple of three strings and a bool). With ``max_chunks`` set,
+    the oldest full chunks are spilled to a temporary file and read back only
+    when the log is iterated. Iterating yields the legacy backup tuples
+    ``(qid, ok, iso_timestamp, mode)``, so ``list(log)`` round trips what
+    ``from_legacy`` read; timestamps that are not plain second-precision ISO
+    strings are kept verbatim on the side.
+    """
+
+    def __init__(self, bank, chunk_size=4096, max_chunks=None, spill_dir=None):
+        self.bank = bank
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.spill_dir = spill_dir
+        self.modes = list(MODES)
+        self._mode_code = {m: i for i, m in enumerate(self.modes)}
+        self.unknown = []           # qids not in the bank, interned
+        self._unknown_code = {}
+        self.raw_ts = {}            # row -> original timestamp when it does not round trip
+        self._chunks = []
+        self._spilled = []          # (offset, row count) in self._spill_path
+        self._spill_path = None
+        self._spilled_rows = 0
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def _encode_qid(self, qid) -> int:
+        i = self.bank.pos.get(qid)
+        if i is not None: return i
+        k = self._unknown_code.get(qid)
+        if k is None:
+            k = self._unknown_code[qid] = len(self.unknown)
+            self.unknown.append(qid)
+        return -(k + 1)
+
+    def _decode_qid(self, i) -> str:
+        return self.bank.ids[i] if i >= 0 else self.unknown[-i - 1]
+
+    def mode_code(self, mode) -> int:
+        c = self._mode_code.get(mode)
+        if c is None:
+            if len(self.modes) >= 256: raise ValueError("too many distinct modes")
+            c = self._mode_code[mode] = len(self.modes)
+            self.modes.append(mode)
+        return c
+
+    def append_raw(self, qidx: int, ok: bool, ts: int, mode: int):
+        if not self._chunks or len(self._chunks[-1]) >= self.chunk_size:
+            self._chunks.append(_Chunk())
+            if self.max_chunks is not None and len(self._chunks) > self.max_chunks:
+                self._spill(self._chunks.pop(0))
+        c = self._chunks[-1]
+        c.q.append(qidx); c.ok.append(1 if ok else 0); c.ts.append(ts); c.mode.append(mode)
+        self._n += 1
+
+    def append(self, qid, ok, ts, mode):
+        """Append a legacy-shaped row ``(qid, ok, iso_timestamp, mode)``."""
+        try:
+            sec = iso_to_epoch(ts)
+            if epoch_to_iso(sec) != ts: self.raw_ts[self._n] = ts
+        except (TypeError, ValueError):
+            sec = 0
+            self.raw_ts[self._n] = ts
+        self.append_raw(self._encode_qid(qid), ok, sec, self.mode_code(mode))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(*row)
+
+    def _spill(self, chunk):
+        if self._spill_path is None:
+            fd, self._spill_path = tempfile.mkstemp(prefix="history-", suffix=".bin", dir=self.spill_dir)
+            os.close(fd)
+            weakref.finalize(self, os.remove, self._spill_path)
+        with open(self._spill_path, "ab") as f:
+            off = f.tell()
+            f.write(chunk.to_bytes())
+        self._spilled.append((off, len(chunk)))
+        self._spilled_rows += len(chunk)
+
+    def _iter_chunks(self):
+        if self._spilled:
+            with open(self._spill_path, "rb") as f:
+                for off, n in self._spilled:
+                    f.seek(off)
+                    yield _Chunk.from_bytes(f.read(4 + 14*n))[0]
+        yield from self._chunks
+
+    def iter_raw(self):
+        for c in self._iter_chunks():
+            yield from zip(c.q, c.ok, c.ts, c.mode)
+
+    def events(self):
+        """``(bank index, ok, epoch_seconds)`` per answer; IDs not in the bank are negative."""
+        for q, ok, ts, md in self.iter_raw():
+            yield q, bool(ok), ts
+
+    def __iter__(self):
+        modes, raw_ts = self.modes, self.raw_ts
+        for row, (q, ok, ts, md) in enumerate(self.iter_raw()):
+            yield (self._decode_qid(q), bool(ok), raw_ts[row] if row in raw_ts else epoch_to_iso(ts), modes[md])
+
+    @classmethod
+    def from_legacy(cls, rows, bank, **kw):
+        log = cls(bank, **kw)
+        log.extend(tuple(r) for r in rows)
+        return log
@@ -0,0 +1,61 @@
+import json
+
+_decoder = json.JSONDecoder()
+
+
+class JsonStream:
+    """Incremental JSON tokenizer over a text stream.
+
+    ``what`` names the document in error messages ("invalid backup: ...").
+    """
+
+    def __init__(self, fp, chunk=1 << 16, what="JSON"):
+        self.fp, self.chunk, self.what = fp, chunk, what
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _more(self, n=None) -> bool:
+        if self.eof: return False
+        data = self.fp.read(max(self.chunk, n or 0))
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf): return self.buf[self.pos]
+            if not self._more(): return ""
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"invalid {self.what}: expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number at the buffer edge may continue in the next chunk.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return v
+            except json.JSONDecodeError:
+                if self.eof: raise
+            # Grow geometrically so a large value is re-scanned O(log n) times.
+            self._more(len(self.buf) - self.pos)
+
+def iter_array(fp, chunk=1 << 16, what="JSON"):
+    """Yield the elements of a top-level JSON array one at a time."""
+    s = JsonStream(fp, chunk, what)
+    s.expect("[")
+    if s.peek() == "]": return
+    while True:
+        yield s.value()
+        if s.peek() == ",": s.pos += 1
+        else: break
+    s.expect("]")
@@ -0,0 +1,192 @@
+import gc, hashlib, json, mmap, os, pickle, struct, tempfile
+from array import array
+
+from .bank import is_mcq, normalize_q, qkey
+from .jsonstream import iter_array
+from .template import Template, TemplateQuestion
+
+# Bump when normalization/validation changes so stale snapshots are ignored.
+SCHEMA_VERSION = 4
+_MAGIC = b"QBANKSN1"
+
+def iter_items(path, errors=None):
+    """Stream ``(position, raw item)`` from a JSON array or JSON Lines (.jsonl) file.
+
+    Positions read ``#<index>`` for arrays and ``line <n>`` for JSON Lines. A
+    line that is not valid JSON is skipped; an array that stops being valid
+    JSON ends the stream with the items read so far. Either way the problem
+    is added to ``errors`` if given.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                line = line.strip()
+                if not line: continue
+                try:
+                    raw = json.loads(line)
+                except json.JSONDecodeError as e:
+                    if errors is not None: errors.append(f"line {n}: invalid JSON ({e.msg})")
+                    continue
+                yield f"line {n}", raw
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            for i, raw in enumerate(iter_array(f, what="question bank")):
+                yield f"#{i}", raw
+        except ValueError as e:  # JSONDecodeError and UnicodeDecodeError included
+            if errors is not None: errors.append(f"{os.path.basename(path)}: {e}")
+
+def check_meta(raw: dict):
+    """ValueError unless the fields the bank indexes and sorts on have usable types."""
+    for k in ("chapter", "section", "type", "explanation"):
+        if k in raw and not isinstance(raw[k], str): raise ValueError(f"{k} must be a string")
+    d = raw.get("difficulty")
+    if d is not None and (isinstance(d, bool) or not isinstance(d, (int, float, str))):
+        raise ValueError("difficulty must be a number or a string")
+
+def validate_q(raw) -> dict:
+    """Normalized question, or ValueError describing why the item is unusable."""
+    if not isinstance(raw, dict): raise ValueError("not an object")
+    if not isinstance(raw.get("question"), str) or not raw["question"].strip():
+        raise ValueError("missing question text")
+    check_meta(raw)
+    opts = raw.get("options")
+    if opts is not None and not (isinstance(opts, list) and all(isinstance(o, str) for o in opts)):
+        raise ValueError("options must be a list of strings")
+    tags = raw.get("tags")
+    if tags is not None and not (isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+        raise ValueError("tags must be a list of strings")
+    q = normalize_q(raw)
+    if is_mcq(q) and q["answer"] not in q["options"]:
+        raise ValueError("answer is not one of the options")
+    q.setdefault("id", qkey(q))
+    return q
+
+def parse_questions(path, errors=None):
+    """Stream, validate and normalize a bank file; invalid items are skipped.
+
+    ``{"type": "template"}`` items become one ``TemplateQuestion`` per
+    variant. Each skipped item adds ``"<position>: <reason>"`` to ``errors``
+    if given (see ``iter_items``), and so does unreadable JSON.
+    """
+    out = []
+    for where, raw in iter_items(path, errors):
+        try:
+            if isinstance(raw, dict) and raw.get("type") == "template":
+                check_meta({k: v for k, v in raw.items() if k != "type"})
+                out.extend(Template(raw).questions())
+            else:
+                out.append(validate_q(raw))
+        except ValueError as e:
+            if errors is not None: errors.append(f"{where}: {e}")
+    return out
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256(str(SCHEMA_VERSION).encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def write_snapshot(path, questions, errors=()):
+    """Write ``questions`` as individually pickled records behind an offsets table.
+
+    Layout: magic, record count, header length, pickled header, (n+1) uint64
+    offsets, records. Template sources go in the header once; their variants
+    are stored as ``(template_id, k)`` records. Written to a temp file and
+    renamed into place, so workers racing on the same snapshot never see a
+    partial file.
+    """
+    templates, records = {}, []
+    for q in questions:
+        if isinstance(q, TemplateQuestion):
+            templates[q.template.id] = q.template.raw
+            records.append((q.template.id, q.k))
+        else:
+            records.append(q)
+    header = pickle.dumps({"errors": list(errors), "templates": templates}, protocol=pickle.HIGHEST_PROTOCOL)
+    blobs = [pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL) for r in records]
+    offsets = array("Q", [0])
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC + struct.pack("<IQ", len(blobs), len(header)) + header)
+            f.write(offsets.tobytes())
+            for b in blobs: f.write(b)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot; records unpickle on access."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != _MAGIC: raise ValueError("not a bank snapshot")
+        n, hlen = struct.unpack_from("<IQ", self._mm, 8)
+        pos = 8 + 12
+        self.header = pickle.loads(self._mm[pos:pos + hlen]); pos += hlen
+        self._offsets = array("Q")
+        self._offsets.frombytes(self._mm[pos:pos + 8 * (n + 1)])
+        self._base = pos + 8 * (n + 1)
+        if self._base + self._offsets[-1] != len(self._mm): raise ValueError("truncated bank snapshot")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        a, b = self._offsets[i], self._offsets[i + 1]
+        return pickle.loads(self._mm[self._base + a:self._base + b])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        self._mm.close()
+
+def load_questions(path, cache_dir=None, errors=None):
+    """Validated questions for ``path``, from a snapshot keyed by the file hash when possible.
+
+    ``cache_dir`` defaults to QUIZ_CACHE_DIR or ``.cache``; pass ``False`` to
+    disable snapshots. Validation messages are appended to ``errors``.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get("QUIZ_CACHE_DIR", ".cache")
+    snap_path = None
+    if cache_dir is not False:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        snap_path = os.path.join(cache_dir, f"{stem}-{file_digest(path)[:16]}.snap")
+        try:
+            snap = Snapshot(snap_path)
+        except (OSError, ValueError, pickle.UnpicklingError, struct.error):
+            pass
+        else:
+            # Unpickling allocates only acyclic dicts/lists; pausing the cyclic
+            # GC roughly halves cold-start time on large banks.
+            was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                if errors is not None: errors.extend(snap.header.get("errors", []))
+                templates = {tid: Template(raw) for tid, raw in snap.header.get("templates", {}).items()}
+                return [TemplateQuestion(templates[r[0]], r[1]) if isinstance(r, tuple) else r for r in snap]
+            finally:
+                if was_enabled: gc.enable()
+                snap.close()
+    errs = []
+    questions = parse_questions(path, errs)
+    if errors is not None: errors.extend(errs)
+    if snap_path is not None:
+        try:
+            write_snapshot(snap_path, questions, errs)
+        except OSError:
+            pass  # read-only deploys just parse every time
+    return questions
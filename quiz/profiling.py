@@ -0,0 +1,82 @@
+import json, os, threading, time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+STAGES = ("load", "filter", "pool", "render", "grade", "stats", "backup")
+
+def percentile(sorted_ms, p: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(len(sorted_ms) * p))] if sorted_ms else 0.0
+
+
+class Profiler:
+    """Opt-in wall-clock timers for the stages of a rerun, shared by every session.
+
+    Samples are kept per ``(stage, mode)`` in a ring of the last ``window``
+    timings, so summaries reflect recent load. Stages may nest (``render``
+    includes the ``grade`` of a submit). When disabled, ``stage`` returns a
+    shared no-op context and costs one attribute check. With ``log_path``
+    set, every sample is also appended to that file as one JSON line.
+    """
+
+    def __init__(self, enabled=False, window=1000, log_path=None):
+        self.enabled = enabled
+        self.window = window
+        self.log_path = log_path
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._noop = nullcontext()
+
+    @classmethod
+    def from_env(cls):
+        """QUIZ_PROFILE=1 turns timing on; QUIZ_PROFILE_LOG names an optional JSONL sink."""
+        return cls(enabled=os.environ.get("QUIZ_PROFILE", "") not in ("", "0"),
+                   log_path=os.environ.get("QUIZ_PROFILE_LOG") or None)
+
+    def stage(self, name, mode=""):
+        return self._time(name, mode) if self.enabled else self._noop
+
+    @contextmanager
+    def _time(self, name, mode):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            # st.rerun() leaves a stage by raising; that time still counts.
+            self.record(name, mode, (time.perf_counter() - t0) * 1000)
+
+    def record(self, name, mode, ms):
+        sample = (time.time(), ms)
+        with self._lock:
+            ring = self._samples.get((name, mode))
+            if ring is None: ring = self._samples[(name, mode)] = deque(maxlen=self.window)
+            ring.append(sample)
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"ts": round(sample[0], 3), "stage": name, "mode": mode, "ms": round(ms, 3)},
+                                       ensure_ascii=False) + "\n")
+
+    def summary(self, by_mode=True):
+        """One row per (stage, mode), or per stage across modes: call count and p50/p95/max in ms."""
+        groups = {}
+        with self._lock:
+            for (name, mode), ring in self._samples.items():
+                groups.setdefault((name, mode if by_mode else "*"), []).extend(ms for _, ms in ring)
+        order = {s: n for n, s in enumerate(STAGES)}
+        rows = []
+        for (name, mode), ms in sorted(groups.items(), key=lambda kv: (order.get(kv[0][0], len(order)), kv[0])):
+            ms.sort()
+            rows.append({"stage": name, "mode": mode, "calls": len(ms), "p50(ms)": round(percentile(ms, .5), 2),
+                         "p95(ms)": round(percentile(ms, .95), 2), "max(ms)": round(ms[-1], 2)})
+        return rows
+
+    def export_jsonl(self) -> bytes:
+        """Every retained sample as ``{"ts", "stage", "mode", "ms"}`` lines, oldest first."""
+        with self._lock:
+            rows = [(ts, name, mode, ms) for (name, mode), ring in self._samples.items() for ts, ms in ring]
+        rows.sort()
+        return "".join(json.dumps({"ts": round(ts, 3), "stage": name, "mode": mode, "ms": round(ms, 3)},
+                                  ensure_ascii=False) + "\n" for ts, name, mode, ms in rows).encode("utf-8")
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
@@ -0,0 +1,70 @@
+import glob, json, os, threading
+
+from .bank import QuestionBank
+from .exam import load_blueprint
+from .loader import load_questions
+
+
+class BankRegistry:
+    """Process-wide catalogue of question banks, each loaded at most once.
+
+    Banks come from ``banks.json`` (a list of ``{"name", "title", "path",
+    "blueprint"}``) when present, otherwise from ``questions.json`` plus any
+    ``banks/*.json`` / ``banks/*.jsonl`` files, with an optional
+    ``banks/<name>.blueprint.json`` next to each. Loaded banks are frozen and
+    shared by every session; sessions keep only the bank name and integer
+    indices into it.
+    """
+
+    def __init__(self, entries, root="."):
+        self.root = root
+        self.entries = {e["name"]: e for e in entries}
+        self._banks = {}
+        self._blueprints = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def discover(cls, root="."):
+        manifest = os.path.join(root, "banks.json")
+        if os.path.exists(manifest):
+            with open(manifest, "r", encoding="utf-8") as f:
+                return cls(json.load(f), root)
+        entries = []
+        if os.path.exists(os.path.join(root, "questions.json")):
+            entries.append({"name": "default", "title": "默认题库", "path": "questions.json", "blueprint": "blueprint.json"})
+        for path in sorted(glob.glob(os.path.join(root, "banks", "*.json")) + glob.glob(os.path.join(root, "banks", "*.jsonl"))):
+            if path.endswith(".blueprint.json"): continue
+            name = os.path.splitext(os.path.basename(path))[0]
+            bp = os.path.join("banks", f"{name}.blueprint.json")
+            entries.append({"name": name, "title": name, "path": os.path.relpath(path, root),
+                            "blueprint": bp if os.path.exists(os.path.join(root, bp)) else None})
+        return cls(entries, root)
+
+    @property
+    def default(self):
+        return next(iter(self.entries), None)
+
+    def names(self):
+        return list(self.entries)
+
+    def title(self, name):
+        return self.entries[name].get("title") or name
+
+    def get(self, name) -> QuestionBank:
+        bank = self._banks.get(name)
+        if bank is not None: return bank
+        with self._lock:
+            bank = self._banks.get(name)
+            if bank is None:
+                e = self.entries[name]
+                errors = []
+                qs = load_questions(os.path.join(self.root, e["path"]), errors=errors)
+                bank = self._banks[name] = QuestionBank(qs, load_errors=errors).freeze()
+        return bank
+
+    def blueprint(self, name) -> dict:
+        bp = self._blueprints.get(name)
+        if bp is None:
+            path = self.entries[name].get("blueprint")
+            bp = self._blueprints[name] = load_blueprint(os.path.join(self.root, path) if path else "")
+        return bp
@@ -0,0 +1,156 @@
+import heapq, math, re
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+_TOKEN = re.compile(r"[㐀-鿿豈-﫿]+|[a-z0-9]+(?:\.[0-9]+)?")
+
+K1, B = 1.2, 0.75
+MAX_EXPANSIONS = 32      # prefix terms tried per query token
+
+def tokenize(text: str):
+    """Character bigrams for CJK runs (a lone character stays a unigram), words for ASCII."""
+    for run in _TOKEN.findall(text.lower()):
+        if _CJK.match(run) and len(run) > 1:
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+        else:
+            yield run
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def question_text(q) -> str:
+    opts = q.get("options") or ()
+    return " ".join([q.get("question",""), *opts, q.get("explanation",""), *q.get("tags", ())])
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking over question, options, explanation and tags.
+
+    Each term maps to parallel arrays of document indices (ascending) and
+    impacts, the query-independent BM25 part ``tf * (k1 + 1) / (tf + k1 *
+    norm)``, plus the positions of its postings by impact, highest first. A
+    query walks its terms' lists in impact order side by side (Fagin's
+    threshold algorithm): every newly seen document is scored in full by
+    binary search into the other lists, and the walk stops once the k-th
+    best score reaches the most an unseen document could still get. The
+    result is exact, and a common term only costs about ``k`` steps when its
+    best postings decide the ranking. When the lists barely overlap (a
+    prefix expanding to many tags) the threshold falls too slowly, so once
+    the lookups would cost more than reading every list, the query is
+    finished by plain accumulation instead. Either way it stays in the
+    millisecond range on 100k-question banks.
+
+    The last query token also matches as a prefix ("契" finds 契税), and an
+    ASCII word with no exact hit matches vocabulary words one edit away.
+    """
+
+    def __init__(self, texts):
+        post = {}
+        lens = array("I")
+        for d, text in enumerate(texts):
+            tf = {}
+            for t in tokenize(text):
+                tf[t] = tf.get(t, 0) + 1
+            lens.append(sum(tf.values()))
+            for t, c in tf.items():
+                p = post.get(t)
+                if p is None: p = post[t] = (array("i"), array("H"))
+                p[0].append(d)
+                p[1].append(min(c, 65535))
+        self.lens = lens
+        self.n = len(lens)
+        self.avgdl = (sum(lens) / self.n) if self.n else 0.0
+        norm = [K1 * (1 - B + B * n / (self.avgdl or 1.0)) for n in lens]
+        self.postings = {}
+        for t, (docs, tfs) in post.items():
+            imps = array("f", (tf * (K1 + 1) / (tf + norm[d]) for d, tf in zip(docs, tfs)))
+            order = array("i", sorted(range(len(docs)), key=imps.__getitem__, reverse=True))
+            self.postings[t] = (docs, imps, order)
+        self.vocab = sorted(post)
+        self._fuzzy = None
+
+    @classmethod
+    def from_bank(cls, bank):
+        return cls(question_text(q) for q in bank)
+
+    def idf(self, term) -> float:
+        df = len(self.postings[term][0])
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def prefixed(self, prefix):
+        """Vocabulary terms starting with ``prefix``, most frequent first."""
+        i = bisect_left(self.vocab, prefix)
+        out = []
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix):
+            out.append(self.vocab[i]); i += 1
+        if len(out) > MAX_EXPANSIONS:
+            out = heapq.nlargest(MAX_EXPANSIONS, out, key=lambda t: len(self.postings[t][0]))
+        return out
+
+    def near(self, word):
+        """ASCII vocabulary words within one edit of ``word``."""
+        if self._fuzzy is None:
+            fz = {}
+            for t in self.vocab:
+                if not _CJK.match(t) and len(t) >= 3:
+                    for v in _deletes(t) | {t}:
+                        fz.setdefault(v, []).append(t)
+            self._fuzzy = fz
+        out = set()
+        for v in _deletes(word) | {word}:
+            out.update(self._fuzzy.get(v, ()))
+        out.discard(word)
+        return sorted(out)
+
+    def expand(self, query):
+        """``(term, weight)`` pairs for a query; partial matches weigh less than exact ones."""
+        toks = list(dict.fromkeys(tokenize(query)))
+        terms = {}
+        for n, t in enumerate(toks):
+            if t in self.postings: terms[t] = max(terms.get(t, 0), 1.0)
+            last = n == len(toks) - 1
+            if last or (_CJK.match(t) and len(t) == 1):
+                for p in self.prefixed(t):
+                    if p != t: terms.setdefault(p, 0.7)
+            if t not in self.postings and not _CJK.match(t) and len(t) >= 4:
+                for w in self.near(t):
+                    terms.setdefault(w, 0.5)
+        return terms
+
+    def search(self, query: str, k: int = 20):
+        """Top ``k`` ``(doc_index, score)`` pairs, best first."""
+        terms = self.expand(query)
+        if not terms or k <= 0: return []
+        lists = [(terms[t] * self.idf(t), *self.postings[t]) for t in terms]
+        budget = sum(len(docs) for _, docs, _, _ in lists)
+        seen, top = set(), []   # top: min-heap of (score, -doc), at most k entries
+        for depth in range(max(len(order) for _, _, _, order in lists)):
+            bound = 0.0
+            for w, docs, imps, order in lists:
+                if depth >= len(order): continue
+                j = order[depth]
+                bound += w * imps[j]
+                d = docs[j]
+                if d in seen: continue
+                seen.add(d)
+                if 4 * len(seen) * len(lists) > budget: return self._accumulate(lists, k)  # a lookup costs ~4 reads
+                s = 0.0
+                for w2, docs2, imps2, _ in lists:
+                    i = bisect_left(docs2, d)
+                    if i < len(docs2) and docs2[i] == d: s += w2 * imps2[i]
+                if len(top) < k: heapq.heappush(top, (s, -d))
+                elif (s, -d) > top[0]: heapq.heapreplace(top, (s, -d))
+            # No unseen document can beat ``bound``: each list gives it at most the impact just read.
+            if len(top) == k and top[0][0] >= bound: break
+        return [(-nd, s) for s, nd in sorted(top, reverse=True)]
+
+    @staticmethod
+    def _accumulate(lists, k):
+        acc = {}
+        for w, docs, imps, _ in lists:
+            for d, im in zip(docs, imps):
+                acc[d] = acc.get(d, 0.0) + w * im
+        return heapq.nlargest(k, acc.items(), key=itemgetter(1))
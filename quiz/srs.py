@@ -0,0 +1,164 @@
+import heapq, itertools
+
+DAY = 86400
+RELEARN_SEC = 600        # a missed card comes back after ten minutes
+GRADUATE_REPS = 3        # consecutive correct reviews before a card leaves 错题
+HARD_LAPSES = 2          # misses before a question counts as 易错
+
+QUEUES = ("review", "hard")
+
+
+class Card:
+    __slots__ = ("ease", "interval", "reps", "lapses", "due", "ver")
+
+    def __init__(self):
+        self.ease = 2.5
+        self.interval = 0.0   # days
+        self.reps = 0
+        self.lapses = 0
+        self.due = 0.0        # epoch seconds
+        self.ver = 0
+
+def sm2(card: Card, ok: bool, now: float):
+    """SM-2 update with a pass/fail grade (4 for a correct answer, 1 for a miss)."""
+    grade = 4 if ok else 1
+    if ok:
+        card.reps += 1
+        card.interval = 1.0 if card.reps == 1 else 6.0 if card.reps == 2 else card.interval * card.ease
+        card.due = now + card.interval * DAY
+    else:
+        card.reps = 0
+        card.lapses += 1
+        card.interval = 0.0
+        card.due = now + RELEARN_SEC
+    card.ease = max(1.3, card.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    card.ver += 1
+
+
+class ReviewScheduler:
+    """Per-learner SM-2 state with two due-ordered queues.
+
+    ``review`` holds missed questions until they graduate (错题重练);
+    ``hard`` holds questions missed at least ``HARD_LAPSES`` times (易错题).
+    Both are binary heaps of ``(due, seq, qid, ver)`` with lazy deletion: an
+    entry whose ``ver`` no longer matches its card is stale and skipped, so
+    answering, deferring and removing are all O(log n) with no resort.
+    Correct answers to questions that were never missed create no card.
+    """
+
+    def __init__(self):
+        self.cards = {}
+        self._heaps = {name: [] for name in QUEUES}
+        self._members = {name: set() for name in QUEUES}
+        self._seq = itertools.count()
+
+    def _push(self, name, qid, card):
+        self._members[name].add(qid)
+        heapq.heappush(self._heaps[name], (card.due, next(self._seq), qid, card.ver))
+
+    def reset_lapses(self, qid):
+        """Forget past misses of ``qid`` and take it out of the 易错 queue."""
+        card = self.cards.get(qid)
+        if card is not None: card.lapses = 0
+        self._members["hard"].discard(qid)
+
+    def _touch(self, qid, card):
+        card.ver += 1
+        for name in QUEUES:
+            if qid in self._members[name]:
+                self._push(name, qid, card)
+
+    def answer(self, qid, ok: bool, now: float):
+        card = self.cards.get(qid)
+        if card is None:
+            if ok: return None
+            card = self.cards[qid] = Card()
+        sm2(card, ok, now)
+        if not ok:
+            self._members["review"].add(qid)
+            if card.lapses >= HARD_LAPSES:
+                self._members["hard"].add(qid)
+        elif card.reps >= GRADUATE_REPS:
+            self._members["review"].discard(qid)
+        for name in QUEUES:
+            if qid in self._members[name]:
+                self._push(name, qid, card)
+        return card
+
+    def peek(self, name="review"):
+        """Question ID due soonest in queue ``name``, or None when it is empty."""
+        heap = self._heaps[name]
+        members = self._members[name]
+        while heap:
+            due, _, qid, ver = heap[0]
+            card = self.cards.get(qid)
+            if qid in members and card is not None and card.ver == ver:
+                return qid
+            heapq.heappop(heap)
+        return None
+
+    def defer(self, qid, name="review"):
+        """Move ``qid`` just behind the next item of ``name`` (the skip button)."""
+        card = self.cards.get(qid)
+        if card is None or qid not in self._members[name]: return
+        heap = self._heaps[name]
+        if self.peek(name) == qid:
+            heapq.heappop(heap)
+        nxt = self.peek(name)
+        if nxt is not None and nxt != qid:
+            card.due = max(card.due, self.cards[nxt].due) + 1
+        self._touch(qid, card)
+
+    def remove(self, qid, name="review"):
+        self._members[name].discard(qid)
+
+    def contains(self, qid, name="review") -> bool:
+        return qid in self._members[name]
+
+    def size(self, name="review") -> int:
+        return len(self._members[name])
+
+    def ids(self, name="review"):
+        return list(self._members[name])
+
+    def due_at(self, qid):
+        card = self.cards.get(qid)
+        return None if card is None else card.due
+
+    @classmethod
+    def from_progress(cls, events, wrong_ids=(), wrong_count=None, known=None, now=0.0):
+        """Rebuild scheduler state by replaying ``(qid, ok, epoch_seconds)`` events.
+
+        The replayed review queue is then aligned with the stored ``wrong_ids``,
+        and when ``wrong_count`` is given it is authoritative for lapse counts
+        (and so for the 易错 queue), since it also covers misses that predate
+        the history. ``known`` restricts tracking to questions still in the bank.
+        """
+        s = cls()
+        for qid, ok, ts in events:
+            if known is None or qid in known:
+                s.answer(qid, ok, ts)
+        if wrong_count is not None:
+            s._members["hard"].clear()
+            for qid, card in s.cards.items():
+                card.lapses = wrong_count.get(qid, 0)
+            for qid, n in wrong_count.items():
+                if n < HARD_LAPSES or (known is not None and qid not in known): continue
+                card = s.cards.setdefault(qid, Card())
+                card.lapses = n
+        wrong = set(q for q in wrong_ids if known is None or q in known)
+        for qid in s._members["review"] - wrong:
+            s.remove(qid, "review")
+        for qid in wrong:
+            card = s.cards.setdefault(qid, Card())
+            if qid not in s._members["review"]:
+                card.due = min(card.due or now, now)
+                s._members["review"].add(qid)
+        for qid, card in s.cards.items():
+            if card.lapses >= HARD_LAPSES:
+                s._members["hard"].add(qid)
+        # Rebuild both heaps from the final state in O(n).
+        for name in QUEUES:
+            heap = s._heaps[name] = [(s.cards[q].due, next(s._seq), q, s.cards[q].ver) for q in s._members[name]]
+            heapq.heapify(heap)
+        return s
@@ -0,0 +1,56 @@
+class ProgressStats:
+    """Running answer aggregates, updated once per answer.
+
+    Counters are ``[attempts, right]`` pairs per question (keyed by bank
+    index), chapter, (chapter, section) and tag, plus the set of distinct
+    questions answered. The progress panel reads them directly instead of
+    rescanning history. Answers to questions outside the bank (other banks,
+    or questions since removed) are not counted.
+    """
+
+    def __init__(self):
+        self.per_q = {}
+        self.chapter = {}
+        self.section = {}
+        self.tag = {}
+        self.done = set()
+        self.attempts = 0
+        self.right = 0
+
+    @staticmethod
+    def _bump(table, key, ok):
+        c = table.get(key)
+        if c is None:
+            c = table[key] = [0, 0]
+        c[0] += 1
+        if ok: c[1] += 1
+
+    def record(self, i, ok, q):
+        ok = bool(ok)
+        self.attempts += 1
+        if ok: self.right += 1
+        self.done.add(i)
+        self._bump(self.per_q, i, ok)
+        ch = q.get("chapter","")
+        self._bump(self.chapter, ch, ok)
+        self._bump(self.section, (ch, q.get("section","")), ok)
+        for t in q.get("tags", []):
+            self._bump(self.tag, t, ok)
+
+    @property
+    def wrong(self):
+        return self.attempts - self.right
+
+    @classmethod
+    def from_history(cls, history, bank):
+        stats = cls()
+        for i, ok, ts in history.events():
+            if i >= 0: stats.record(i, ok, bank[i])
+        return stats
+
+    def chapter_rows(self):
+        rows = []
+        for ch, (t, r) in self.chapter.items():
+            acc = (r/t*100) if t else 0.0
+            rows.append({"chapter": ch or "(未分类)", "attempts": t, "right": r, "accuracy(%)": round(acc,1)})
+        return rows
@@ -0,0 +1,351 @@
+import atexit, itertools, json, os, sqlite3, threading, time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+
+_REVISIONS = itertools.count(1)   # shared by every store, so a revision never repeats in a process
+
+def empty_progress() -> dict:
+    return {"history": [], "wrong_ids": [], "wrong_count": {}, "favorites": [], "exam_records": []}
+
+
+class ProgressStore(ABC):
+    """Per-user progress persistence.
+
+    Mutations are small events (one answer, one favorite toggle, ...) so a
+    session never has to serialize its whole state. ``load`` returns the same
+    shape as the JSON backup blob. Backends implement every abstract method,
+    calling ``_changed(user)`` from each progress mutation; batching and
+    flushing are optional.
+    """
+
+    def __init__(self):
+        self._revs = {}
+
+    def _changed(self, user):
+        self._revs[user] = next(_REVISIONS)
+
+    def revision(self, user):
+        """Token that changes whenever ``load(user)`` may have changed, and never repeats."""
+        return self._revs.get(user, 0)
+
+    @abstractmethod
+    def load(self, user: str) -> dict: ...
+    @abstractmethod
+    def append_answer(self, user, qid, ok, ts, mode): ...
+    @abstractmethod
+    def set_wrong(self, user, qid, wrong: bool): ...
+    @abstractmethod
+    def add_wrong_count(self, user, qid, n: int = 1): ...
+    @abstractmethod
+    def set_favorite(self, user, qid, on: bool): ...
+    @abstractmethod
+    def add_exam_record(self, user, rec: dict): ...
+    @abstractmethod
+    def replace(self, user, data: dict): ...
+    # The one unfinished exam per user, as ExamSession.to_state() (not part of backups). Each paper
+    # has an ID (state["paper"]): save_exam only overwrites another paper with create=True, and
+    # claim_exam deletes the row only if it still holds that paper, so it is graded exactly once.
+    @abstractmethod
+    def load_exam(self, user): ...
+    @abstractmethod
+    def save_exam(self, user, state: dict, create=False): ...
+    @abstractmethod
+    def claim_exam(self, user, paper) -> bool: ...
+    @abstractmethod
+    def clear_exam(self, user): ...
+
+    def batch(self): return nullcontext()
+    def flush(self): pass
+    def maybe_flush(self): pass
+    def close(self): self.flush()
+
+
+class MemoryStore(ProgressStore):
+    """Process-local store, for tests and single-user runs."""
+
+    def __init__(self):
+        super().__init__()
+        self._users = {}
+        self._exams = {}
+        self._lock = threading.Lock()
+
+    def _u(self, user):
+        return self._users.setdefault(user, {
+            "history": [], "wrong_ids": {}, "wrong_count": {}, "favorites": {}, "exam_records": []})
+
+    def load(self, user):
+        with self._lock:
+            u = self._u(user)
+            return {"history": list(u["history"]), "wrong_ids": list(u["wrong_ids"]),
+                    "wrong_count": dict(u["wrong_count"]), "favorites": list(u["favorites"]),
+                    "exam_records": [dict(r) for r in u["exam_records"]]}
+
+    def append_answer(self, user, qid, ok, ts, mode):
+        self._changed(user)
+        with self._lock:
+            self._u(user)["history"].append((qid, bool(ok), ts, mode))
+
+    def set_wrong(self, user, qid, wrong):
+        self._changed(user)
+        with self._lock:
+            w = self._u(user)["wrong_ids"]
+            if wrong: w[qid] = None
+            else: w.pop(qid, None)
+
+    def add_wrong_count(self, user, qid, n=1):
+        self._changed(user)
+        with self._lock:
+            wc = self._u(user)["wrong_count"]
+            wc[qid] = wc.get(qid, 0) + n
+
+    def set_favorite(self, user, qid, on):
+        self._changed(user)
+        with self._lock:
+            f = self._u(user)["favorites"]
+            if on: f[qid] = None
+            else: f.pop(qid, None)
+
+    def add_exam_record(self, user, rec):
+        self._changed(user)
+        with self._lock:
+            self._u(user)["exam_records"].append(dict(rec))
+
+    def replace(self, user, data):
+        self._changed(user)
+        with self._lock:
+            self._users.pop(user, None)
+            u = self._u(user)
+            u["history"] = [tuple(h) for h in data.get("history", [])]
+            u["wrong_ids"] = dict.fromkeys(data.get("wrong_ids", []))
+            u["wrong_count"] = dict(data.get("wrong_count", {}))
+            u["favorites"] = dict.fromkeys(data.get("favorites", []))
+            u["exam_records"] = [dict(r) for r in data.get("exam_records", [])]
+
+    def load_exam(self, user):
+        with self._lock:
+            row = self._exams.get(user)
+            return None if row is None else json.loads(row[1])
+
+    def save_exam(self, user, state, create=False):
+        with self._lock:
+            row = self._exams.get(user)
+            if create or (row is not None and row[0] == state.get("paper")):
+                self._exams[user] = (state.get("paper"), json.dumps(state, ensure_ascii=False))
+
+    def claim_exam(self, user, paper):
+        with self._lock:
+            row = self._exams.get(user)
+            if row is None or row[0] != paper: return False
+            del self._exams[user]
+            return True
+
+    def clear_exam(self, user):
+        with self._lock:
+            self._exams.pop(user, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL, qid TEXT NOT NULL, ok INTEGER NOT NULL, ts TEXT, mode TEXT);
+CREATE INDEX IF NOT EXISTS answers_user ON answers (user, seq);
+CREATE TABLE IF NOT EXISTS wrong (user TEXT NOT NULL, qid TEXT NOT NULL, PRIMARY KEY (user, qid));
+CREATE TABLE IF NOT EXISTS wrong_count (
+    user TEXT NOT NULL, qid TEXT NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (user, qid));
+CREATE TABLE IF NOT EXISTS favorites (user TEXT NOT NULL, qid TEXT NOT NULL, PRIMARY KEY (user, qid));
+CREATE TABLE IF NOT EXISTS exam_records (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT NOT NULL, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS exam_records_user ON exam_records (user, seq);
+CREATE TABLE IF NOT EXISTS exam_state (user TEXT PRIMARY KEY, data TEXT NOT NULL, paper TEXT);
+"""
+
+
+class SQLiteStore(ProgressStore):
+    """SQLite-backed store shared by every session in the process.
+
+    The database runs in WAL mode so readers never block the writer. Writes
+    are queued and committed together once ``batch_size`` statements are
+    pending or ``flush_interval`` seconds have passed; ``load`` flushes first
+    so a user always reads their own writes. Another process holding the
+    write lock is waited on for ``busy_timeout`` seconds; if it still holds
+    it, the queued writes go back on the queue and the next flush retries
+    them; writes made inside ``batch()`` are dropped instead (see there).
+    """
+
+    def __init__(self, path="progress.db", batch_size=64, flush_interval=2.0, busy_timeout=5.0):
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._hold = False
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        if "paper" not in {r[1] for r in self._db.execute("PRAGMA table_info(exam_state)")}:
+            self._db.execute("ALTER TABLE exam_state ADD COLUMN paper TEXT")
+
+    def _queue(self, sql, args):
+        with self._lock:
+            self._pending.append((sql, args))
+            if not self._hold:
+                self.maybe_flush()
+
+    def maybe_flush(self):
+        with self._lock:
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except sqlite3.OperationalError:
+                    pass  # still locked by another worker; the writes stay queued for the next flush
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                if self._db.in_transaction: self._db.execute("COMMIT")  # a claim_exam with nothing after it
+                return
+            pending, self._pending = self._pending, []
+            try:
+                if not self._db.in_transaction: self._db.execute("BEGIN")
+                for sql, args in pending:
+                    self._db.execute(sql, args)
+                self._db.execute("COMMIT")
+            except Exception as e:
+                if self._db.in_transaction: self._db.execute("ROLLBACK")
+                if isinstance(e, sqlite3.OperationalError):
+                    # Busy or locked: nothing was written, so retry everything later, oldest first.
+                    self._pending[:0] = pending
+                raise
+
+    @contextmanager
+    def batch(self):
+        """Commit everything written inside the block as one transaction, or none of it.
+
+        If that commit fails the block's writes are dropped, not retried, so a
+        caller that saw the error (a failed restore) never has them land later.
+        """
+        with self._lock:
+            hold = self._hold
+            if not hold: self.flush()  # earlier writes commit on their own, and claim_exam sees them
+            start = len(self._pending)
+            self._hold = True
+            try:
+                yield
+            except BaseException:
+                del self._pending[start:]
+                if not hold and self._db.in_transaction: self._db.execute("ROLLBACK")  # undo a claim_exam
+                raise
+            finally:
+                self._hold = hold
+            if not hold:
+                try:
+                    self.flush()
+                except sqlite3.OperationalError:
+                    del self._pending[start:]  # flush re-queued them; nothing was queued after
+                    raise
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+    def revision(self, user):
+        # data_version moves when another process commits, which may have been this user.
+        with self._lock:
+            return super().revision(user), self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self, user):
+        with self._lock:
+            self.flush()
+            db = self._db
+            return {
+                "history": [(qid, bool(ok), ts, mode) for qid, ok, ts, mode in
+                            db.execute("SELECT qid, ok, ts, mode FROM answers WHERE user=? ORDER BY seq", (user,))],
+                "wrong_ids": [r[0] for r in db.execute("SELECT qid FROM wrong WHERE user=? ORDER BY rowid", (user,))],
+                "wrong_count": dict(db.execute("SELECT qid, n FROM wrong_count WHERE user=?", (user,))),
+                "favorites": [r[0] for r in db.execute("SELECT qid FROM favorites WHERE user=? ORDER BY rowid", (user,))],
+                "exam_records": [json.loads(r[0]) for r in
+                                 db.execute("SELECT data FROM exam_records WHERE user=? ORDER BY seq", (user,))],
+            }
+
+    def append_answer(self, user, qid, ok, ts, mode):
+        self._changed(user)
+        self._queue("INSERT INTO answers (user, qid, ok, ts, mode) VALUES (?,?,?,?,?)", (user, qid, int(bool(ok)), ts, mode))
+
+    def set_wrong(self, user, qid, wrong):
+        self._changed(user)
+        if wrong: self._queue("INSERT OR IGNORE INTO wrong (user, qid) VALUES (?,?)", (user, qid))
+        else: self._queue("DELETE FROM wrong WHERE user=? AND qid=?", (user, qid))
+
+    def add_wrong_count(self, user, qid, n=1):
+        self._changed(user)
+        self._queue("INSERT INTO wrong_count (user, qid, n) VALUES (?,?,?) "
+                    "ON CONFLICT (user, qid) DO UPDATE SET n = n + excluded.n", (user, qid, n))
+
+    def set_favorite(self, user, qid, on):
+        self._changed(user)
+        if on: self._queue("INSERT OR IGNORE INTO favorites (user, qid) VALUES (?,?)", (user, qid))
+        else: self._queue("DELETE FROM favorites WHERE user=? AND qid=?", (user, qid))
+
+    def add_exam_record(self, user, rec):
+        self._changed(user)
+        self._queue("INSERT INTO exam_records (user, data) VALUES (?,?)", (user, json.dumps(rec, ensure_ascii=False)))
+
+    def replace(self, user, data):
+        self._changed(user)
+        with self.batch():  # a failed restore leaves the old progress intact
+            for table in ("answers", "wrong", "wrong_count", "favorites", "exam_records"):
+                self._queue(f"DELETE FROM {table} WHERE user=?", (user,))
+            for h in data.get("history", []):
+                self.append_answer(user, *h)
+            for qid in data.get("wrong_ids", []):
+                self.set_wrong(user, qid, True)
+            for qid, n in data.get("wrong_count", {}).items():
+                self.add_wrong_count(user, qid, n)
+            for qid in data.get("favorites", []):
+                self.set_favorite(user, qid, True)
+            for rec in data.get("exam_records", []):
+                self.add_exam_record(user, rec)
+
+    def load_exam(self, user):
+        with self._lock:
+            self.flush()
+            row = self._db.execute("SELECT data FROM exam_state WHERE user=?", (user,)).fetchone()
+            return None if row is None else json.loads(row[0])
+
+    def save_exam(self, user, state, create=False):
+        data = json.dumps(state, ensure_ascii=False)
+        if create:
+            self._queue("INSERT INTO exam_state (user, data, paper) VALUES (?,?,?) ON CONFLICT (user) "
+                        "DO UPDATE SET data = excluded.data, paper = excluded.paper", (user, data, state.get("paper")))
+        else:
+            self._queue("UPDATE exam_state SET data=? WHERE user=? AND paper=?", (data, user, state.get("paper")))
+
+    def claim_exam(self, user, paper):
+        """Compare-and-delete, run at once. Inside ``batch()`` it opens the block's transaction
+        (taking the write lock), so the delete commits together with the block's writes or not at all."""
+        with self._lock:
+            if not self._db.in_transaction:
+                if not self._hold: self.flush()
+                self._db.execute("BEGIN IMMEDIATE")
+            claimed = self._db.execute("DELETE FROM exam_state WHERE user=? AND paper=?", (user, paper)).rowcount > 0
+            if not self._hold: self._db.execute("COMMIT")
+            return claimed
+
+    def clear_exam(self, user):
+        self._queue("DELETE FROM exam_state WHERE user=?", (user,))
+
+def open_store(kind=None, path=None) -> ProgressStore:
+    """Backend from arguments or the QUIZ_STORE / QUIZ_DB_PATH environment variables."""
+    kind = kind or os.environ.get("QUIZ_STORE", "sqlite")
+    if kind == "memory":
+        return MemoryStore()
+    if kind == "sqlite":
+        store = SQLiteStore(path or os.environ.get("QUIZ_DB_PATH", "progress.db"))
+        atexit.register(store.flush)
+        return store
+    raise ValueError(f"unknown progress store: {kind}")
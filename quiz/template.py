@@ -0,0 +1,206 @@
+import ast, functools, random, string
+from collections.abc import Mapping
+from math import gcd
+
+# Calls a template formula may use; everything else is rejected at load time.
+_FUNCS = {"abs": abs, "round": round, "min": min, "max": max}
+_OPS = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+        ast.Div: lambda a, b: a / b, ast.USub: lambda a: -a, ast.UAdd: lambda a: a}
+
+def compile_expr(src: str):
+    """Parse an arithmetic formula over parameter names into a checked AST."""
+    try:
+        tree = ast.parse(src, mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"bad formula {src!r}") from e
+    for node in ast.walk(tree):
+        ok = isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Name, ast.Load, ast.Call)) or type(node) in _OPS \
+            or (isinstance(node, ast.Constant) and isinstance(node.value, (int, float)))
+        if isinstance(node, ast.Call):
+            ok = isinstance(node.func, ast.Name) and node.func.id in _FUNCS and not node.keywords
+        if not ok: raise ValueError(f"unsupported syntax in formula {src!r}")
+    return tree
+
+def evaluate(node, env):
+    if isinstance(node, ast.Constant): return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in env: raise ValueError(f"unknown name {node.id!r}")
+        return env[node.id]
+    if isinstance(node, ast.BinOp): return _OPS[type(node.op)](evaluate(node.left, env), evaluate(node.right, env))
+    if isinstance(node, ast.UnaryOp): return _OPS[type(node.op)](evaluate(node.operand, env))
+    return _FUNCS[node.func.id](*(evaluate(a, env) for a in node.args))
+
+def _fmt(x):
+    # Parameters print as the hand-written items did: 20, not 20.0.
+    return str(int(x)) if isinstance(x, float) and x.is_integer() else str(x)
+
+def _fields(text):
+    return {f for _, f, _, _ in string.Formatter().parse(text) if f}
+
+
+class Template:
+    """A parameterized MCQ that expands into ``variants`` concrete questions.
+
+    Source form (one item in the bank file)::
+
+        {"type": "template", "id": "price-gap", "variants": 49,
+         "chapter": ..., "section": ..., "difficulty": 5, "tags": [...],
+         "question": "挂牌价{L}万，成交价{D}万……",
+         "params": {"L": [310, 790, 10], "gap": [5, 75, 5]},      # inclusive ranges
+         "let": {"D": "L - gap"},
+         "digits": 2,
+         "answer": {"text": "（{L}-{D}）÷{D}≈{v}%", "value": "(L - D) / D * 100"},
+         "distractors": [{"text": ..., "value": ...}, ...]}
+
+    ``{v}`` in an option is its formula's value rounded to ``digits``. Variant
+    ``k`` takes the ``k``-th point of the parameter grid under an affine
+    permutation seeded by the template ID, so variants never repeat and any
+    one of them is computed in O(1) without expanding the rest.
+
+    Alternatively ``params`` lists names and ``cases`` gives the exact value
+    tuples, one variant per case in order (``"params": ["L", "D"], "cases":
+    [[320, 265], ...]``); that is how hand-written items are folded into a
+    template without changing them. ``legacy_ids``, aligned with the
+    variants, records the IDs those items had, so stored progress follows
+    them (see ``QuestionBank.aliases``).
+    """
+
+    def __init__(self, raw: dict):
+        if not isinstance(raw.get("id"), str) or not raw["id"]: raise ValueError("template needs an id")
+        if not isinstance(raw.get("question"), str) or not raw["question"].strip():
+            raise ValueError("missing question text")
+        self.raw = raw
+        self.id = raw["id"]
+        self.digits = int(raw.get("digits", 2))
+        self.cases = None
+        if "cases" in raw:
+            names, cases = raw.get("params"), raw["cases"]
+            if not (isinstance(names, list) and names and all(isinstance(n, str) for n in names)):
+                raise ValueError("with cases, params must be a list of names")
+            if not (isinstance(cases, list) and cases and all(
+                    isinstance(c, list) and len(c) == len(names)
+                    and all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in c) for c in cases)):
+                raise ValueError(f"cases must be lists of {len(names)} numbers")
+            self.axes = [(n, None) for n in names]
+            self.cases = [tuple(c) for c in cases]
+            self.size = len(self.cases)
+        else:
+            try:
+                self.axes = [(name, range(lo, hi + 1, step)) for name, (lo, hi, step) in raw.get("params", {}).items()]
+            except (TypeError, ValueError, AttributeError) as e:
+                raise ValueError("params must map names to [low, high, step]") from e
+            if not self.axes: raise ValueError("template has no params")
+            self.size = 1
+            for _, r in self.axes:
+                self.size *= len(r)
+        self.variants = int(raw.get("variants", self.size))
+        if not 0 < self.variants <= self.size: raise ValueError(f"variants must be 1..{self.size}")
+        self.legacy_ids = raw.get("legacy_ids", [])
+        if not (isinstance(self.legacy_ids, list) and len(self.legacy_ids) in (0, self.variants)
+                and all(isinstance(x, str) for x in self.legacy_ids)):
+            raise ValueError("legacy_ids must list one ID per variant")
+        self.let = [(name, compile_expr(src)) for name, src in raw.get("let", {}).items()]
+        opts = [raw.get("answer")] + list(raw.get("distractors", []))
+        if len(opts) < 2 or not all(isinstance(o, dict) and isinstance(o.get("text"), str) for o in opts):
+            raise ValueError("template needs an answer and at least one distractor, each with text and value")
+        self.options = [(o["text"], compile_expr(str(o["value"]))) for o in opts]
+        names = {n for n, _ in self.axes} | {n for n, _ in self.let} | {"v"}
+        for text in [raw["question"]] + [t for t, _ in self.options]:
+            missing = _fields(text) - names
+            if missing: raise ValueError(f"unknown placeholder {sorted(missing)[0]!r}")
+        rng = random.Random(self.id)
+        self._a = rng.randrange(1, self.size) if self.size > 1 else 1
+        while gcd(self._a, self.size) != 1: self._a += 1
+        self._b = rng.randrange(self.size)
+        self.base = {k: raw[k] for k in ("chapter", "section", "difficulty", "explanation") if k in raw}
+        self.base["tags"] = tuple(raw.get("tags", []))
+        self.base["type"] = "mcq"
+        self.expand(0)  # surfaces formula errors while loading, not while rendering
+
+    def params(self, k: int) -> dict:
+        if self.cases is not None:
+            env = dict(zip((n for n, _ in self.axes), self.cases[k]))
+        else:
+            j = (self._a * k + self._b) % self.size
+            env = {}
+            for name, r in reversed(self.axes):
+                j, m = divmod(j, len(r))
+                env[name] = r[m]
+        for name, node in self.let:
+            env[name] = evaluate(node, env)
+        return env
+
+    def expand(self, k: int) -> dict:
+        """The concrete question for variant ``k``; cached, as every rerun renders it again."""
+        return _expand(self, k)
+
+    def questions(self):
+        return [TemplateQuestion(self, k) for k in range(self.variants)]
+
+@functools.lru_cache(maxsize=2048)
+def _expand(t: Template, k: int) -> dict:
+    env = t.params(k)
+    try:
+        shown = {n: _fmt(v) for n, v in env.items()}
+        values = [round(evaluate(node, env), t.digits) for _, node in t.options]
+        options = tuple(text.format(**shown, v=v) for (text, _), v in zip(t.options, values))  # values keep float form: 8.0%, 8.7%
+    except (ArithmeticError, ValueError) as e:
+        raise ValueError(f"template {t.id} variant {k}: {e}") from e
+    if len(set(options)) != len(options): raise ValueError(f"template {t.id} variant {k}: duplicate options")
+    return {"question": t.raw["question"].format(**shown), "options": options, "answer": options[0],
+            "value": values[0], "values": tuple(values)}
+
+
+class TemplateQuestion(Mapping):
+    """Read-only question view of one template variant.
+
+    Chapter, section, tags and difficulty come straight from the template,
+    so indexing a bank never expands anything; text and options are built on
+    first access.
+    """
+
+    __slots__ = ("template", "k", "_id")
+
+    def __init__(self, template: Template, k: int):
+        self.template = template
+        self.k = k
+        self._id = f"{template.id}#{k}"
+
+    def __getitem__(self, key):
+        if key == "id": return self._id
+        base = self.template.base
+        if key in base: return base[key]
+        if key == "explanation": return ""
+        return self.template.expand(self.k)[key]
+
+    def __iter__(self):
+        base = self.template.base
+        yield "id"
+        yield from base
+        if "explanation" not in base: yield "explanation"
+        yield from ("question", "options", "answer", "value", "values")
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"TemplateQuestion({self._id!r})"
+
+    @property
+    def legacy_id(self):
+        """The ID this variant had as a hand-written item, if the template records one."""
+        ids = self.template.legacy_ids
+        return ids[self.k] if ids else None
+
+    def check(self, choice) -> bool:
+        """Grade by computed value: ``choice`` may be an option's text, its index, or a number."""
+        q = self.template.expand(self.k)
+        if isinstance(choice, str):
+            if choice not in q["options"]: return False
+            choice = q["options"].index(choice)
+        if isinstance(choice, int) and not isinstance(choice, bool):
+            # Only the answer's own formula counts, even if a distractor rounds to the same value.
+            return choice == 0
+        if isinstance(choice, float):
+            return abs(choice - q["value"]) <= 0.5 * 10 ** -self.template.digits
+        return False
@@ -0,0 +1,18 @@
+import os, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from quiz import QuestionBank
+from quiz.exam import load_blueprint
+from synth import synthetic_bank
+
+@pytest.fixture(scope="session")
+def bank():
+    return QuestionBank(synthetic_bank(400)).freeze()
+
+@pytest.fixture(scope="session")
+def blueprint():
+    return load_blueprint(os.path.join(ROOT, "blueprint.json"))
@@ -0,0 +1,38 @@
+import random
+
+from quiz.adaptive import AdaptiveSelector, SkillModel, p_correct
+from quiz.engine import AdaptivePractice, Session
+from quiz.store import MemoryStore
+
+def test_skill_moves_toward_observed_answers(bank):
+    q = bank[0]
+    up, down = SkillModel(), SkillModel()
+    for _ in range(20):
+        up.record(q, True); down.record(q, False)
+    assert up.expect(q) > p_correct(0, 0) > down.expect(q)
+    assert up.evidence(q["chapter"]) == 20
+
+def test_sparse_filter_picks_only_matching_questions(bank):
+    f = bank.facets
+    mask = bank.select(chapters=f.chapters[:1], tags=f.tags[:1])
+    allowed = set(bank.indices(mask))
+    assert allowed
+    sel, rng, served = AdaptiveSelector(bank, mask), random.Random(0), set()
+    for _ in range(len(allowed)):
+        i = sel.next(SkillModel(), exclude=served, rng=rng)
+        assert i in allowed and i not in served
+        served.add(i)
+    assert sel.next(SkillModel(), exclude=served, rng=rng) in allowed   # exhausted: repeats rather than stops
+
+def test_empty_filter_gives_nothing(bank):
+    assert AdaptiveSelector(bank, 0).next(SkillModel()) is None
+
+def test_round_never_repeats(bank):
+    pm = AdaptivePractice(Session(bank, "u", MemoryStore()), "随机练习", limit=30, rng=random.Random(1))
+    seen = []
+    for _ in range(30):
+        i = pm.current()
+        seen.append(i)
+        pm.submit(bank[i]["answer"])
+        pm.advance()
+    assert len(set(seen)) == 30 and pm.pos == 0
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setenv("QUIZ_DB_PATH", str(tmp_path / "progress.db"))
+    monkeypatch.setenv("QUIZ_CACHE_DIR", str(tmp_path / "cache"))
+    st.cache_resource.clear()   # the store is per process; give each test its own database
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.query_params["uid"] = "tester"
+    return at
+
+def test_every_mode_renders(app):
+    app.run()
+    assert not app.exception
+    for b in [b for b in app.button if (b.key or "").startswith("tab_")]:
+        app.button(key=b.key).click().run()
+        assert not app.exception, b.key
+
+def test_answering_a_question_records_it(app):
+    app.run()
+    app.button(key="tab_顺序练习").click().run()
+    next(b for b in app.button if b.label == "✅ 提交答案").click().run()
+    assert not app.exception
+    assert len(app.session_state.learner.history) == 1
+
+def test_backup_is_rebuilt_after_writes_from_another_tab(app):
+    app.run()
+    next(b for b in app.button if b.label == "📦 生成备份文件").click().run()
+    assert app.get("download_button")
+    app.run()
+    assert app.get("download_button")   # reused while nothing changed
+    app.session_state.learner.store.set_favorite("tester", "someone-else's-tab", True)
+    app.run()
+    assert not app.get("download_button")
@@ -0,0 +1,56 @@
+import gzip, io, json
+
+import pytest
+
+from quiz.backup import encode_backup, read_backup
+
+DATA = {"history": [["q1", True, "2024-05-01T10:00:00", "顺序练习"], ["q2", False, "2024-05-01T10:01:00", "随机练习"]],
+        "wrong_ids": ["q2"], "wrong_count": {"q2": 2}, "favorites": ["q1"],
+        "exam_records": [{"timestamp": "2024-05-02T09:00:00", "score": 75.0, "passed": True}]}
+
+EXPECTED = {"history": [("q1", True, "2024-05-01T10:00:00", "顺序练习"), ("q2", False, "2024-05-01T10:01:00", "随机练习")],
+            "wrong_ids": ["q2"], "wrong_count": {"q2": 2}, "favorites": ["q1"],
+            "exam_records": [{"timestamp": "2024-05-02T09:00:00", "score": 75.0, "passed": True}]}
+
+def test_old_pretty_printed_backup():
+    # Older versions wrote indented JSON through json.dump(..., ensure_ascii=False, indent=2).
+    blob = json.dumps(DATA, ensure_ascii=False, indent=2).encode("utf-8")
+    assert read_backup(io.BytesIO(blob)) == (EXPECTED, 0)
+
+@pytest.mark.parametrize("fmt", ["json", "json.gz"])
+def test_encoded_backup_round_trips(fmt):
+    blob = encode_backup(DATA, fmt)
+    assert (blob[:2] == b"\x1f\x8b") == (fmt == "json.gz")
+    assert read_backup(io.BytesIO(blob)) == (EXPECTED, 0)
+
+def test_unknown_backup_format():
+    with pytest.raises(ValueError):
+        encode_backup(DATA, "xml")
+
+def test_invalid_entries_are_skipped_and_counted():
+    bad = {**DATA, "history": DATA["history"] + [["q3", True], [1, True, "t", "m"]],
+           "wrong_ids": ["q2", 7], "wrong_count": {"q2": 2, "q4": -1, "q5": True, "q6": "3"},
+           "exam_records": DATA["exam_records"] + ["oops"], "extra": {"ignored": 1}}
+    assert read_backup(io.BytesIO(encode_backup(bad))) == (EXPECTED, 7)
+
+def test_non_object_wrong_count_is_skipped():
+    bad = {**DATA, "wrong_count": [["q2", 2]]}
+    data, skipped = read_backup(io.BytesIO(encode_backup(bad)))
+    assert data["wrong_count"] == {} and skipped == 1
+
+def test_progress_callback_reports_items_read():
+    seen = []
+    read_backup(io.BytesIO(encode_backup(DATA)), on_chunk=seen.append, chunk_size=2)
+    assert seen == [2, 4, 6, 6]
+
+@pytest.mark.parametrize("blob", [
+    b"",
+    b"[1, 2]",
+    b'{"history": [["q1", true, "t", "m"]',
+    b'{"history": [["q1", tru, "t", "m"]]}',
+    gzip.compress(b'{"history": [')[:-4],
+    b"\xff\xfe{}",
+])
+def test_malformed_backup_raises_value_error(blob):
+    with pytest.raises(ValueError):
+        read_backup(io.BytesIO(blob))
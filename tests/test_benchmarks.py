@@ -0,0 +1,30 @@
+"""Run each benchmark script end to end on tiny inputs, so they keep working as the engine changes."""
+import sys
+
+import pytest
+
+import bench_adaptive, bench_engine, bench_exam, bench_search
+from quiz.store import MemoryStore
+
+@pytest.mark.parametrize("module, argv", [
+    (bench_search, ["--sizes", "300", "--repeat", "1"]),
+    (bench_exam, ["--sizes", "300", "--repeat", "2"]),
+    (bench_engine, ["--sizes", "300", "--sessions", "5", "--answers", "5"]),
+    (bench_engine, ["--sizes", "300", "--sessions", "5", "--answers", "5", "--store", "sqlite"]),
+    (bench_adaptive, ["--size", "300", "--learners", "2", "--limit", "20", "--cap", "100"]),
+])
+def test_benchmark_runs(module, argv, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", [module.__file__, *argv])
+    module.main()
+    assert "300" in capsys.readouterr().out
+
+def test_engine_workload_records_every_answer(bank, blueprint):
+    learners = bench_engine.simulate(bank, blueprint, sessions=3, answers=10, store=MemoryStore())
+    for s in learners:
+        assert len(s.exam_records) == 1
+        assert len(s.history) >= 10 + blueprint["total"]
+
+@pytest.mark.parametrize("strategy", ["shuffle", "adaptive"])
+def test_adaptive_learner_simulation(bank, strategy):
+    served, picks = bench_adaptive.run(bank, strategy, bench_adaptive.CHAPTERS[:2], limit=20, cap=50, seed=0)
+    assert 1 <= served <= 50 and len(picks) == served
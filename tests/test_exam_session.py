@@ -0,0 +1,70 @@
+import pytest
+
+from quiz.engine import ExamSession, Session
+from quiz.store import MemoryStore, SQLiteStore
+
+T0 = 1_800_000_000.0
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStore()
+    else:
+        s = SQLiteStore(str(tmp_path / "p.db"))
+        yield s
+        s.close()
+
+def start(bank, blueprint, store, user="u", **kw):
+    return ExamSession.start(Session(bank, user, store), blueprint, seed="s1", bank_name="b", now=T0, **kw)
+
+def test_resume_restores_answers_position_and_clock(bank, blueprint, store):
+    exam = start(bank, blueprint, store)
+    assert len(exam) == blueprint["total"]
+    exam.answer(exam.pool[0], bank[exam.pool[0]]["answer"])
+    exam.move(3)
+    exam.checkpoint(T0 + 30)
+    again = ExamSession.resume(Session(bank, "u", store), bank_name="b", now=T0 + 60)
+    assert again.pool == exam.pool and again.answers == exam.answers and again.pos == 3
+    assert again.paper == exam.paper and again.remaining(T0 + 60) == exam.remaining(T0 + 60)
+    assert not again.submitted
+
+def test_resume_ignores_other_banks_and_users(bank, blueprint, store):
+    start(bank, blueprint, store)
+    assert ExamSession.resume(Session(bank, "u", store), bank_name="other", now=T0) is None
+    assert ExamSession.resume(Session(bank, "v", store), bank_name="b", now=T0) is None
+
+def test_expired_paper_is_submitted_on_resume(bank, blueprint, store):
+    start(bank, blueprint, store, duration_sec=600)
+    exam = ExamSession.resume(Session(bank, "u", store), bank_name="b", now=T0 + 601)
+    assert exam.submitted and exam.result["recorded"]
+    assert exam.result["record"]["correct"] == 0
+    assert store.load_exam("u") is None
+    assert len(Session(bank, "u", store).exam_records) == 1
+
+def test_submit_is_recorded_once_per_object(bank, blueprint, store):
+    exam = start(bank, blueprint, store)
+    for i in exam.pool[:10]:
+        exam.answer(i, bank[i]["answer"])
+    first = exam.submit()
+    assert exam.submit() is first
+    assert first["record"]["correct"] == 10 and first["record"]["total"] == len(exam)
+    s = Session(bank, "u", store)
+    assert len(s.exam_records) == 1 and len(s.history) == len(exam)
+
+def test_submit_is_recorded_once_per_paper(bank, blueprint, store):
+    a = start(bank, blueprint, store)
+    b = ExamSession.resume(Session(bank, "u", store), bank_name="b", now=T0 + 5)
+    assert a.submit()["recorded"]
+    b.answer(b.pool[0], "x")
+    b.checkpoint(T0 + 20, force=True)   # must not bring the submitted paper back
+    assert store.load_exam("u") is None
+    assert not b.submit()["recorded"]
+    s = Session(bank, "u", store)
+    assert len(s.exam_records) == 1 and len(s.history) == len(a)
+
+def test_new_paper_replaces_an_unfinished_one(bank, blueprint, store):
+    old = start(bank, blueprint, store)
+    new = ExamSession.start(Session(bank, "u", store), blueprint, seed="s2", bank_name="b", now=T0 + 1)
+    old.checkpoint(T0 + 30, force=True)
+    assert store.load_exam("u")["paper"] == new.paper
+    assert not old.submit()["recorded"] and new.submit()["recorded"]
@@ -0,0 +1,38 @@
+from quiz import is_mcq
+from quiz.facets import Facets
+
+def brute(bank, chapters=(), sections=(), tags=(), difficulties=()):
+    def ok(q, skip=None):
+        return bool(is_mcq(q)
+                and (skip == "chapter" or not chapters or q["chapter"] in chapters)
+                and (skip == "section" or not sections or q["section"] in sections)
+                and (skip == "tag" or not tags or set(q["tags"]) & set(tags))
+                and (skip == "difficulty" or not difficulties or q["difficulty"] in difficulties))
+    qs = list(bank)
+    return {"total": sum(ok(q) for q in qs),
+            "chapter": {c: sum(ok(q, "chapter") and q["chapter"] == c for q in qs) for c in bank.facets.chapters},
+            "section": {s: sum(ok(q, "section") and q["section"] == s for q in qs) for s in bank.facets.sections(bank.facets.chapters)},
+            "tag": {t: sum(ok(q, "tag") and t in q["tags"] for q in qs) for t in bank.facets.tags},
+            "difficulty": {d: sum(ok(q, "difficulty") and q["difficulty"] == d for q in qs) for d in bank.facets.difficulties}}
+
+def test_counts_exclude_each_dimensions_own_filter(bank):
+    f = bank.facets
+    ch = f.chapters[:2]
+    for sel in [{}, {"chapters": ch}, {"chapters": ch, "tags": f.tags[:3]},
+                {"tags": f.tags[:1], "difficulties": [1, 5]}, {"sections": f.sections(ch)[:4], "tags": f.tags[:5]}]:
+        got = f.counts(**sel)
+        want = brute(bank, **sel)
+        assert {k: got[k] for k in want} == want, sel
+
+def test_counts_are_memoized_per_filter(bank):
+    f = Facets(bank, cache_size=2)
+    a = f.counts(["附录·计算公式"])
+    assert f.counts(["附录·计算公式"]) is a
+    f.counts(["税费与登记"]); f.counts(["法律责任与合规"])
+    assert f.counts(["附录·计算公式"]) is not a
+
+def test_sections_of_chapters(bank):
+    f = bank.facets
+    secs = f.sections(f.chapters[:1])
+    assert secs == sorted(secs) and all(s.startswith(f.chapters[0]) for s in secs)
+    assert f.sections([]) == []
@@ -0,0 +1,31 @@
+from quiz.history import HistoryLog, epoch_to_iso, iso_to_epoch
+
+def rows(bank, n=50):
+    out = []
+    for k in range(n):
+        qid = bank.ids[k % len(bank)] if k % 7 else f"gone-{k % 3}"
+        out.append((qid, k % 4 != 0, epoch_to_iso(1_700_000_000 + 60 * k), ("顺序练习", "模拟考试")[k % 2]))
+    return out
+
+def test_legacy_rows_round_trip(bank):
+    legacy = rows(bank) + [
+        (bank.ids[0], True, "2024-05-01T10:00:00.123456", "随机练习"),   # sub-second
+        (bank.ids[1], False, "2024-05-01 10:00:00", "搜索"),              # space separator
+        (bank.ids[2], True, "not a time", "旧版模式"),                     # garbage, unknown mode
+    ]
+    log = HistoryLog.from_legacy(legacy, bank)
+    assert len(log) == len(legacy)
+    assert list(log) == legacy
+
+def test_spilled_chunks_round_trip(bank, tmp_path):
+    legacy = rows(bank, 300)
+    log = HistoryLog.from_legacy(legacy, bank, chunk_size=16, max_chunks=2, spill_dir=str(tmp_path))
+    assert log._spilled and len(log._chunks) <= 2
+    assert list(log) == legacy
+
+def test_events_use_bank_indices(bank):
+    legacy = rows(bank, 8)
+    events = list(HistoryLog.from_legacy(legacy, bank).events())
+    for (qid, ok, ts, _), (i, ok2, sec) in zip(legacy, events):
+        assert (bank.ids[i] if i >= 0 else None) == (qid if qid in bank.pos else None)
+        assert ok2 == ok and sec == iso_to_epoch(ts)
@@ -0,0 +1,88 @@
+import json, os
+
+import pytest
+
+from quiz import QuestionBank
+from quiz.loader import Snapshot, load_questions, parse_questions
+from quiz.template import TemplateQuestion
+
+ITEMS = [
+    {"chapter": "税费与登记", "section": "契税", "question": "契税的纳税人是？", "options": ["买方", "卖方"], "answer": "买方"},
+    {"question": "问答题：简述网签流程。", "answer": "略"},
+    {"type": "template", "id": "gap", "chapter": "附录·计算公式", "question": "挂牌价{L}万，成交价{D}万？",
+     "params": ["L", "D"], "cases": [[320, 265], [500, 480]], "digits": 1,
+     "answer": {"text": "{v}%", "value": "(L - D) / D * 100"},
+     "distractors": [{"text": "{v}%", "value": "(L - D) / L * 100"}]},
+    {"question": "答案不在选项里", "options": ["A", "B"], "answer": "C"},
+    "not an object",
+]
+
+def write(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+    return str(path)
+
+def test_parse_skips_invalid_items_with_their_position(tmp_path):
+    errors = []
+    qs = parse_questions(write(tmp_path / "bank.json", ITEMS), errors)
+    assert len(qs) == 4 and [type(q) for q in qs[2:]] == [TemplateQuestion] * 2
+    assert errors == ["#3: answer is not one of the options", "#4: not an object"]
+    assert all(q["id"] for q in qs)
+
+def test_snapshot_round_trip(tmp_path):
+    path, cache = write(tmp_path / "bank.json", ITEMS), str(tmp_path / "cache")
+    errors1, errors2 = [], []
+    first = load_questions(path, cache_dir=cache, errors=errors1)
+    assert len(os.listdir(cache)) == 1
+    second = load_questions(path, cache_dir=cache, errors=errors2)
+    assert [dict(q) for q in second] == [dict(q) for q in first]
+    assert [type(q) for q in second] == [type(q) for q in first]
+    assert errors2 == errors1 and len(errors1) == 2
+
+def test_snapshot_is_keyed_by_file_content(tmp_path):
+    path, cache = write(tmp_path / "bank.json", ITEMS[:1]), str(tmp_path / "cache")
+    assert len(load_questions(path, cache_dir=cache)) == 1
+    write(tmp_path / "bank.json", ITEMS[:2])
+    assert len(load_questions(path, cache_dir=cache)) == 2
+    assert len(os.listdir(cache)) == 2
+
+def test_corrupt_snapshot_is_reparsed(tmp_path):
+    path, cache = write(tmp_path / "bank.json", ITEMS), str(tmp_path / "cache")
+    expected = [dict(q) for q in load_questions(path, cache_dir=cache)]
+    snap = os.path.join(cache, os.listdir(cache)[0])
+    with open(snap, "r+b") as f:
+        f.truncate(os.path.getsize(snap) - 3)
+    assert [dict(q) for q in load_questions(path, cache_dir=cache)] == expected
+    assert len(Snapshot(snap)) == 4
+
+def test_jsonl_bad_lines_are_recorded(tmp_path):
+    path = tmp_path / "bank.jsonl"
+    path.write_text("\n".join([json.dumps(ITEMS[0], ensure_ascii=False), "{oops", "", json.dumps(ITEMS[1])]), encoding="utf-8")
+    errors = []
+    qs = load_questions(str(path), cache_dir=False, errors=errors)
+    assert len(qs) == 2
+    assert len(errors) == 1 and errors[0].startswith("line 2: invalid JSON")
+
+def test_truncated_array_keeps_items_read_so_far(tmp_path):
+    path = tmp_path / "bank.json"
+    text = json.dumps(ITEMS[:2], ensure_ascii=False)
+    path.write_text(text[:-30], encoding="utf-8")
+    errors = []
+    qs = load_questions(str(path), cache_dir=False, errors=errors)
+    assert len(qs) == 1
+    assert len(errors) == 1 and errors[0].startswith("bank.json: ")
+
+@pytest.mark.parametrize("bad, reason", [
+    ({"section": ["s"]}, "section must be a string"),
+    ({"chapter": 2}, "chapter must be a string"),
+    ({"difficulty": [1]}, "difficulty must be a number or a string"),
+    ({"difficulty": True}, "difficulty must be a number or a string"),
+    ({"explanation": {"zh": "x"}}, "explanation must be a string"),
+])
+def test_badly_typed_fields_are_load_errors(tmp_path, bad, reason):
+    items = [ITEMS[0], {**ITEMS[0], "question": "另一题", **bad}, {**ITEMS[2], **bad}]
+    errors = []
+    qs = load_questions(write(tmp_path / "bank.json", items), cache_dir=False, errors=errors)
+    assert errors == [f"#1: {reason}", f"#2: {reason}"]
+    bank = QuestionBank(qs).freeze()
+    assert len(bank) == 1 and bank.facets.chapters == ["税费与登记"]
@@ -0,0 +1,36 @@
+import random
+
+from quiz.search import SearchIndex, tokenize
+
+def brute(ix, query, k):
+    scores = {}
+    for t, weight in ix.expand(query).items():
+        docs, imps, _ = ix.postings[t]
+        for d, imp in zip(docs, imps):
+            scores[d] = scores.get(d, 0.0) + weight * ix.idf(t) * imp
+    return sorted(scores.values(), reverse=True)[:k]
+
+def test_tokenize_bigrams_cjk_and_keeps_ascii_words():
+    assert list(tokenize("契税3.5% ABC")) == ["契税", "3.5", "abc"]
+    assert list(tokenize("税")) == ["税"]
+
+def test_common_term_ranks_every_posting():
+    # The best match sits far down a long posting list.
+    ix = SearchIndex(["契税 房产 土地 面积 规定"] * 9000 + ["契税 契税 契税 土地 规定"])
+    assert ix.search("契税", 3)[0][0] == 9000
+
+def test_ranking_matches_exhaustive_scoring():
+    rng = random.Random(1)
+    words = ["契税", "土地", "增值", "税率", "房产", "abc", "abd", "xyz"]
+    ix = SearchIndex(" ".join(rng.choice(words) * rng.randint(1, 3) for _ in range(rng.randint(1, 12)))
+                     for _ in range(2000))
+    for query in ["契税", "契税 土地", "土地增值 税率", "ab", "xyzz", "房产 abc 契税"]:
+        for k in (1, 5, 50):
+            got = [round(s, 9) for _, s in ix.search(query, k)]
+            assert got == [round(s, 9) for s in brute(ix, query, k)], (query, k)
+
+def test_prefix_and_fuzzy_expansion():
+    ix = SearchIndex(["契税 计税依据", "增值税 abcd", "土地"])
+    assert [d for d, _ in ix.search("契", 5)] == [0]
+    assert [d for d, _ in ix.search("abce", 5)] == [1]
+    assert ix.search("不存在", 5) == [] and ix.search("契税", 0) == []
@@ -0,0 +1,48 @@
+from quiz.srs import DAY, HARD_LAPSES, RELEARN_SEC, ReviewScheduler
+
+def test_correct_answer_to_unseen_question_creates_no_card():
+    s = ReviewScheduler()
+    assert s.answer("a", True, 0) is None
+    assert s.peek() is None and s.size() == 0
+
+def test_queue_orders_by_due_and_graduates_after_three_correct():
+    s = ReviewScheduler()
+    s.answer("a", False, 0)
+    s.answer("b", False, 10)
+    assert s.peek() == "a"
+    assert s.due_at("a") == RELEARN_SEC
+    for n, t in enumerate((100, 100 + DAY, 100 + 7 * DAY)):
+        s.answer("a", True, t)
+        assert s.contains("a") == (n < 2)
+    assert s.peek() == "b" and s.size() == 1
+
+def test_repeated_misses_enter_the_hard_queue():
+    s = ReviewScheduler()
+    for t in range(HARD_LAPSES):
+        s.answer("a", False, t)
+    assert s.contains("a", "hard") and s.peek("hard") == "a"
+    s.reset_lapses("a")
+    assert s.peek("hard") is None and s.contains("a")
+
+def test_defer_moves_behind_the_next_item():
+    s = ReviewScheduler()
+    for t, q in enumerate("abc"):
+        s.answer(q, False, t * 100)
+    s.defer("a")
+    assert s.peek() == "b"
+    assert s.due_at("a") > s.due_at("b")
+    s.remove("b")
+    assert s.peek() == "a"
+
+def test_defer_of_the_only_item_keeps_it():
+    s = ReviewScheduler()
+    s.answer("a", False, 0)
+    s.defer("a")
+    assert s.peek() == "a"
+
+def test_from_progress_follows_stored_wrong_ids_and_counts():
+    events = [("a", False, 0), ("b", False, 1), ("c", True, 2)]
+    s = ReviewScheduler.from_progress(events, wrong_ids=["b", "d"], wrong_count={"b": 3}, known={"a", "b", "c"}, now=5)
+    assert sorted(s.ids()) == ["b"]
+    assert s.ids("hard") == ["b"]
+    assert s.peek() == "b"
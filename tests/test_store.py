@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from quiz.store import MemoryStore, ProgressStore, SQLiteStore
+
+ROW = ("q1", True, "2024-05-01T10:00:00", "顺序练习")
+
+@pytest.fixture
+def store(tmp_path):
+    s = SQLiteStore(str(tmp_path / "p.db"), busy_timeout=0.05)
+    yield s
+    s.close()
+
+@pytest.fixture
+def locker(store):
+    db = sqlite3.connect(store.path, isolation_level=None)
+    yield db
+    db.close()
+
+def test_writes_outside_a_batch_are_retried_after_a_lock(store, locker):
+    locker.execute("BEGIN IMMEDIATE")
+    store.append_answer("u", *ROW)
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    locker.execute("COMMIT")
+    assert store.load("u")["history"] == [ROW]
+
+def test_failed_batch_is_never_applied_later(store, locker):
+    store.append_answer("u", *ROW)
+    store.flush()
+    locker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError):
+        store.replace("u", {"history": [("q2", False, "2024-05-02T10:00:00", "随机练习")]})
+    locker.execute("COMMIT")
+    store.flush()
+    assert store.load("u")["history"] == [ROW]
+
+def test_exception_inside_a_batch_discards_its_writes(store):
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.append_answer("u", *ROW)
+            raise RuntimeError
+    store.flush()
+    assert store.load("u")["history"] == []
+
+def test_incomplete_backend_fails_on_creation():
+    methods = {k: getattr(MemoryStore, k) for k in ProgressStore.__abstractmethods__ if k != "claim_exam"}
+    with pytest.raises(TypeError, match="claim_exam"):
+        type("Partial", (ProgressStore,), methods)()
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_revision_moves_on_every_progress_write(kind, tmp_path):
+    s = MemoryStore() if kind == "memory" else SQLiteStore(str(tmp_path / "r.db"))
+    seen = {s.revision("u")}
+    for write in (lambda: s.append_answer("u", *ROW), lambda: s.set_favorite("u", "q1", True),
+                  lambda: s.set_wrong("u", "q1", True), lambda: s.add_wrong_count("u", "q1"),
+                  lambda: s.add_exam_record("u", {"score": 1}), lambda: s.replace("u", {})):
+        write()
+        assert s.revision("u") not in seen
+        seen.add(s.revision("u"))
+    other = s.revision("v")
+    s.append_answer("u", *ROW)
+    assert s.revision("v") == other
+    assert MemoryStore().revision("u") == 0
+
+def test_revision_sees_commits_from_another_process(store, tmp_path):
+    before = store.revision("u")
+    other = SQLiteStore(store.path)
+    other.append_answer("u", *ROW)
+    other.close()
+    assert store.revision("u") != before
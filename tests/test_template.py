@@ -0,0 +1,61 @@
+import pytest
+
+from quiz.template import Template, TemplateQuestion
+
+def raw(**kw):
+    t = {"id": "gap", "chapter": "附录·计算公式", "difficulty": 4, "tags": ["价差率"],
+         "question": "挂牌价{L}万元，成交价{D}万元，价差率约为？",
+         "params": {"L": [100, 200, 10], "gap": [5, 20, 5]}, "let": {"D": "L - gap"}, "digits": 1,
+         "answer": {"text": "{v}%", "value": "(L - D) / D * 100"},
+         "distractors": [{"text": "{v}%", "value": "(L - D) / L * 100"}]}
+    t.update(kw)
+    return t
+
+def test_grid_variants_are_distinct_and_stable():
+    t = Template(raw())
+    assert t.size == t.variants == 11 * 4
+    points = {(t.params(k)["L"], t.params(k)["gap"]) for k in range(t.variants)}
+    assert len(points) == t.variants
+    assert Template(raw()).expand(7) == t.expand(7)
+
+def test_expand_fills_text_and_computes_the_answer():
+    t = Template(raw())
+    for k in range(t.variants):
+        env, q = t.params(k), t.expand(k)
+        assert q["question"] == f"挂牌价{env['L']}万元，成交价{env['D']}万元，价差率约为？"
+        assert q["answer"] == q["options"][0] == f"{q['value']}%"
+        assert q["value"] == round(env["gap"] / env["D"] * 100, 1)
+
+def test_question_view_reads_base_fields_without_expanding():
+    q = Template(raw()).questions()[3]
+    assert isinstance(q, TemplateQuestion)
+    assert q["id"] == "gap#3" and q["chapter"] == "附录·计算公式" and q["tags"] == ("价差率",)
+    assert q["type"] == "mcq" and q["explanation"] == ""
+    assert set(dict(q)) >= {"question", "options", "answer"}
+
+def test_check_accepts_text_index_and_value():
+    q = Template(raw()).questions()[0]
+    assert q.check(q["answer"]) and q.check(0) and q.check(q["value"] + 0.04)
+    assert not q.check(q["options"][1]) and not q.check(1) and not q.check("x") and not q.check(True)
+    assert not q.check(q["value"] + 0.1)
+
+def test_cases_keep_hand_written_values_and_legacy_ids():
+    t = Template(raw(params=["L", "D"], cases=[[320, 265], [500, 480]], legacy_ids=["old1", "old2"], let={}))
+    qs = t.questions()
+    assert [q.legacy_id for q in qs] == ["old1", "old2"]
+    assert qs[0]["question"] == "挂牌价320万元，成交价265万元，价差率约为？"
+    assert qs[1]["answer"] == "4.2%"
+
+@pytest.mark.parametrize("bad", [
+    {"let": {"D": "__import__('os').getcwd()"}},
+    {"let": {"D": "L.real"}},
+    {"question": "{X} 是多少？"},
+    {"distractors": []},
+    {"params": {"L": "1-9"}},
+    {"variants": 0},
+    {"params": ["L", "D"], "cases": [[1, 2, 3]], "let": {}},
+    {"params": ["L", "D"], "cases": [[320, 265]], "let": {}, "legacy_ids": ["a", "b"]},
+])
+def test_invalid_templates_are_rejected(bad):
+    with pytest.raises(ValueError):
+        Template(raw(**bad))